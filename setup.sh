@@ -13,7 +13,7 @@ python3 -m venv .venv
 source .venv/bin/activate
 
 # 4. Install deps
-pip install httpx openai python-dotenv pydantic
+pip install 'httpx[http2]' openai python-dotenv pydantic orjson
 
 # 5. Create directory structure
 mkdir -p src/{collectors,features,llm,models,validation} data logs
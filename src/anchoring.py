@@ -6,17 +6,33 @@ Solves: LLM copy-pasting previous analysis verbatim instead of re-evaluating.
 
 from __future__ import annotations
 
-import json
+import bisect
 import logging
-from datetime import datetime, timezone
+import math
+import time
+from datetime import datetime
+
+import orjson
 
 log = logging.getLogger(__name__)
 
-# After this many minutes with no new signals, stop anchoring entirely
-STALE_THRESHOLD_MINUTES = 90
+# Anchor score = (1 + signals_since) ** REINFORCEMENT_EXPONENT * 2 ** (-age / HALF_LIFE)
+# Exponential forgetting, reinforced by market activity since the analysis.
+HALF_LIFE_MINUTES = 45
+REINFORCEMENT_EXPONENT = 0.3
+
+# Score thresholds: below DROP the anchor is omitted entirely; below WEAK it is
+# "re-evaluate from scratch"; below MODERATE it is "check against signals".
+DROP_SCORE = 0.1
+WEAK_SCORE = 0.25
+MODERATE_SCORE = 0.6
 
-# After this many minutes, downgrade anchoring from "maintain" to "re-evaluate"
-SOFT_STALE_MINUTES = 45
+_NO_TRADE_TMPL = "  • {asset}: NO_TRADE (playbook {playbook})"
+_SETUP_TMPL = (
+    "  • {asset} {direction} (playbook {playbook}, conf={confidence}): "
+    "trigger={trigger}, stop={stop}, TP1={tp1}\n"
+    "    Invalidated if: {invalidations}"
+)
 
 
 def build_anchoring_context(
@@ -27,7 +43,7 @@ def build_anchoring_context(
 
     Returns None if:
     - No previous analysis exists
-    - Previous analysis is too stale (>90min with no confirming signals)
+    - The anchor score has decayed below DROP_SCORE (~2.5h with no signals)
 
     Returns a SHORT text summary (not raw JSON) otherwise.
     """
@@ -39,86 +55,60 @@ def build_anchoring_context(
         return None
 
     # --- Staleness check ---
-    try:
-        prev_dt = datetime.fromisoformat(prev_ts)
-        now = datetime.now(timezone.utc)
-        age_minutes = (now - prev_dt).total_seconds() / 60
-    except Exception:
-        age_minutes = 999
+    prev_ms = prev_analysis.get("ts_ms") or _iso_to_ms(prev_ts)
+    if prev_ms is None:
+        log.warning(f"Unparseable previous analysis timestamp: {prev_ts!r}")
+        return None
+    age_minutes = (time.time() * 1000 - prev_ms) / 60_000
 
-    # Count signals that fired AFTER the previous analysis
-    signals_since = _count_signals_since(signals, prev_ts)
+    # Signals that fired AFTER the previous analysis
+    recent = _signals_since(signals, prev_ms)
+    signals_since = len(recent)
 
-    # Hard stale: old analysis + no market activity confirming it
-    if age_minutes > STALE_THRESHOLD_MINUTES and signals_since == 0:
+    score = _anchor_score(age_minutes, signals_since)
+    if score < DROP_SCORE:
         log.info(
-            f"Previous analysis is {age_minutes:.0f}min old with 0 signals since. "
-            f"Dropping anchor — forcing fresh analysis."
+            f"Previous analysis is {age_minutes:.0f}min old with {signals_since} signals "
+            f"since (score={score:.2f}). Dropping anchor — forcing fresh analysis."
         )
         return None
 
     # --- Extract thesis summary from raw JSON ---
-    raw = prev_analysis.get("raw", "")
-    try:
-        parsed = json.loads(raw)
-    except (json.JSONDecodeError, TypeError):
+    parsed = _parse_raw(prev_analysis.get("raw", ""))
+    if parsed is None:
         return None
 
-    setups = parsed.get("setups", [])
-    regime = parsed.get("regime", "unknown")
-    regime_note = parsed.get("regime_note", "")
+    setups = parsed["setups"]
+    regime = parsed["regime"]
+    regime_note = parsed["regime_note"]
 
+    # The thesis (regime + setups) is fixed for a given previous analysis;
+    # age and strength change every call, so they follow it.
     lines = []
     lines.append(f"Previous regime: {regime} ({regime_note})")
+    for s in setups:
+        lines.append(_format_setup(s))
     lines.append(f"Age: {age_minutes:.0f} minutes ago | Signals since: {signals_since}")
 
     # Determine anchor strength
-    if age_minutes > SOFT_STALE_MINUTES and signals_since == 0:
+    if score < WEAK_SCORE:
         lines.append(
-            "ANCHOR STRENGTH: WEAK — analysis is aging with no confirming signals. "
+            f"ANCHOR STRENGTH: WEAK (score={score:.2f}) — thesis has decayed. "
             "Re-evaluate from scratch. Only maintain if data still strongly supports it."
         )
-    elif age_minutes > SOFT_STALE_MINUTES and signals_since > 0:
+    elif score < MODERATE_SCORE:
         lines.append(
-            "ANCHOR STRENGTH: MODERATE — thesis is aging but market has been active. "
+            f"ANCHOR STRENGTH: MODERATE (score={score:.2f}) — thesis is aging. "
             "Check whether signals confirm or contradict the previous thesis."
         )
     else:
         lines.append(
-            "ANCHOR STRENGTH: STRONG — recent analysis. Maintain unless a key level "
-            "was breached or an invalidation condition was met."
-        )
-
-    for s in setups:
-        direction = s.get("direction", "?")
-        asset = s.get("asset", "?")
-        playbook = s.get("playbook", "?")
-        confidence = s.get("confidence", 0)
-
-        if direction == "no_trade":
-            lines.append(f"  • {asset}: NO_TRADE (playbook {playbook})")
-            continue
-
-        entry = s.get("entry", {})
-        levels = entry.get("levels", {})
-        trigger = levels.get("trigger", 0)
-        stop = s.get("stop", {}).get("level", 0)
-
-        tps = s.get("take_profits", [])
-        tp1 = tps[0].get("level", 0) if tps else 0
-
-        invalidations = s.get("invalidations", [])
-        inv_str = "; ".join(invalidations[:2]) if invalidations else "none specified"
-
-        lines.append(
-            f"  • {asset} {direction.upper()} (playbook {playbook}, conf={confidence}): "
-            f"trigger={trigger}, stop={stop}, TP1={tp1}"
+            f"ANCHOR STRENGTH: STRONG (score={score:.2f}) — recent analysis. Maintain "
+            "unless a key level was breached or an invalidation condition was met."
         )
-        lines.append(f"    Invalidated if: {inv_str}")
 
     # Add what signals have happened since
     if signals_since > 0:
-        recent = _get_signals_since(signals, prev_ts)
         # Deduplicate and summarize
         summary = _summarize_signals(recent)
         if summary:
@@ -129,31 +119,88 @@ def build_anchoring_context(
     return "\n".join(lines)
 
 
-def _count_signals_since(signals: list[dict], prev_ts: str) -> int:
-    """Count signals that occurred after the previous analysis timestamp."""
-    count = 0
-    for sig in signals:
-        sig_ts = sig.get("ts", "")
-        if sig_ts > prev_ts:
-            count += 1
-    return count
+def _parse_raw(raw: str) -> dict | None:
+    """Extract regime, regime_note and setups from the previous raw LLM output."""
+    try:
+        parsed = orjson.loads(raw)
+    except (orjson.JSONDecodeError, TypeError):
+        return None
+    if not isinstance(parsed, dict):
+        return None
+    return {
+        "regime": parsed.get("regime", "unknown"),
+        "regime_note": parsed.get("regime_note", ""),
+        "setups": parsed.get("setups", []),
+    }
+
+
+def _format_setup(s: dict) -> str:
+    """Render one previous setup as its summary line(s)."""
+    direction = s.get("direction", "?")
+    if direction == "no_trade":
+        return _NO_TRADE_TMPL.format(
+            asset=s.get("asset", "?"), playbook=s.get("playbook", "?")
+        )
+
+    tps = s.get("take_profits") or []
+    invalidations = s.get("invalidations") or []
+    return _SETUP_TMPL.format(
+        asset=s.get("asset", "?"),
+        direction=direction.upper(),
+        playbook=s.get("playbook", "?"),
+        confidence=s.get("confidence", 0),
+        trigger=((s.get("entry") or {}).get("levels") or {}).get("trigger", 0),
+        stop=(s.get("stop") or {}).get("level", 0),
+        tp1=tps[0].get("level", 0) if tps else 0,
+        invalidations="; ".join(invalidations[:2]) if invalidations else "none specified",
+    )
+
+
+def _anchor_score(age_minutes: float, signals_since: int) -> float:
+    """Exponential decay by age, reinforced by the number of signals since."""
+    decay = math.exp(-math.log(2) * max(age_minutes, 0.0) / HALF_LIFE_MINUTES)
+    return (1 + signals_since) ** REINFORCEMENT_EXPONENT * decay
+
 
+def _signals_since(signals: list[dict], prev_ms: int) -> list[dict]:
+    """Signals after the previous analysis (epoch ms).
+
+    The signal log is append-only, so signals are already in timestamp order
+    and the cut point can be found by binary search.
+    """
+    idx = bisect.bisect_right(signals, prev_ms, key=_signal_ms)
+    return signals[idx:]
+
+
+def _signal_ms(sig: dict) -> int:
+    return sig.get("ts_ms") or _iso_to_ms(sig.get("ts")) or 0
 
-def _get_signals_since(signals: list[dict], prev_ts: str) -> list[dict]:
-    """Get signals that occurred after the previous analysis."""
-    return [s for s in signals if s.get("ts", "") > prev_ts]
+
+def _iso_to_ms(ts: str | None) -> int | None:
+    """Epoch ms from an ISO timestamp — only for records written before ts_ms."""
+    try:
+        return int(datetime.fromisoformat(ts).timestamp() * 1000)
+    except (TypeError, ValueError):
+        return None
 
 
 def _summarize_signals(signals: list[dict]) -> list[str]:
     """Summarize signals into readable lines, deduplicating noise."""
-    # Group by (asset, event, level) and keep the latest
-    seen: dict[tuple, dict] = {}
-    for sig in signals:
+    # Keep the latest signal per (asset, event, level): walk newest-first and
+    # skip keys already taken. Only the deduplicated set gets sorted, so the
+    # summary order stays deterministic.
+    seen: set[tuple] = set()
+    latest: list[tuple[tuple, dict]] = []
+    for sig in reversed(signals):
         key = (sig.get("asset"), sig.get("event"), sig.get("level", ""))
-        seen[key] = sig  # last one wins
+        if key in seen:
+            continue
+        seen.add(key)
+        latest.append((key, sig))
+    latest.sort(key=lambda item: item[0])
 
     lines = []
-    for (asset, event, level), sig in sorted(seen.items()):
+    for (asset, event, level), sig in latest:
         price = sig.get("price", "?")
         level_val = sig.get("level_value", "")
         pct = sig.get("pct")
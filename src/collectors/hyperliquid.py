@@ -2,6 +2,7 @@
 
 Batches API calls to minimize rate-limit exposure.
 Stores raw snapshots in SQLite for feature computation.
+Per-asset requests fan out concurrently, so a cycle costs ~max RTT, not Σ RTT.
 
 V2: Added daily, 4h, 1h candles + funding history tracking.
 """
@@ -9,19 +10,103 @@ V2: Added daily, 4h, 1h candles + funding history tracking.
 from __future__ import annotations
 
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
 import httpx
 
-from src.config import HL_INFO_URL, ASSETS
+from src.config import HL_INFO_URL, HL_WEIGHT_PER_MINUTE, ASSETS, CANDLE_TIMEFRAMES
 
 log = logging.getLogger(__name__)
 
 _TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=100)
+_MAX_WORKERS = 16
+
+_INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "8h": 28_800_000,
+    "12h": 43_200_000, "1d": 86_400_000, "3d": 259_200_000, "1w": 604_800_000,
+}
+
+
+def _candle_cfg(timeframes: tuple[tuple[str, int], ...]) -> tuple[tuple[str, int], ...]:
+    """(interval, bars) pairs → (interval, lookback_ms) pairs."""
+    cfg = []
+    for interval, bars in timeframes:
+        if interval not in _INTERVAL_MS:
+            raise ValueError(f"Unsupported candle interval in CANDLE_TIMEFRAMES: {interval}")
+        cfg.append((interval, bars * _INTERVAL_MS[interval]))
+    return tuple(cfg)
+
+
+# (interval, lookback_ms) per candle timeframe, e.g. ("15m", 18_000_000) = 20 bars
+_CANDLE_CFG = _candle_cfg(CANDLE_TIMEFRAMES)
+
+# Hyperliquid info-endpoint request weights (IP budget is 1200/min).
+# Unlisted request types cost 20.
+_REQUEST_WEIGHTS = {"l2Book": 2, "allMids": 2}
+_DEFAULT_WEIGHT = 20
+_MAX_WEIGHT = max(_DEFAULT_WEIGHT, *_REQUEST_WEIGHTS.values())
+# Longest a single request may wait for budget before giving up
+_MAX_WAIT_SECONDS = 5.0
+
+
+class _WeightBucket:
+    """Thread-safe token bucket: blocks callers briefly instead of eating a 429."""
+
+    def __init__(self, per_minute: int) -> None:
+        if per_minute < _MAX_WEIGHT:
+            raise ValueError(
+                f"HL_WEIGHT_PER_MINUTE must be at least {_MAX_WEIGHT} "
+                f"(the heaviest request weight), got {per_minute}"
+            )
+        self._capacity = float(per_minute)
+        self._rate = per_minute / 60.0
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, weight: int) -> None:
+        deadline = time.monotonic() + _MAX_WAIT_SECONDS
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._capacity, self._tokens + (now - self._updated) * self._rate
+                )
+                self._updated = now
+                if self._tokens >= weight:
+                    self._tokens -= weight
+                    return
+                wait = (weight - self._tokens) / self._rate
+            if now + wait > deadline:
+                log.warning(f"Rate budget exhausted: weight {weight} would wait {wait:.1f}s")
+                raise RuntimeError(f"Hyperliquid weight budget exhausted (weight {weight})")
+            time.sleep(wait)
+
+
+_BUCKET = _WeightBucket(HL_WEIGHT_PER_MINUTE)
+
+# The perp universe changes rarely; rebuild the name → index map on TTL
+# expiry, or immediately if the universe size changes (new listing).
+_UNIVERSE_TTL_SECONDS = 900
+_universe_cache: dict = {"ts": 0.0, "size": 0, "sym_to_idx": {}}
+
+
+def new_client() -> httpx.Client:
+    """HTTP/2 client with a keep-alive pool, meant to live for the whole process.
+
+    Reusing it across polls skips the TCP+TLS handshake, and HTTP/2 multiplexes
+    the concurrent per-asset requests over a single connection.
+    """
+    return httpx.Client(http2=True, timeout=_TIMEOUT, limits=_LIMITS)
 
 
 def _post(client: httpx.Client, payload: dict) -> dict | list:
+    _BUCKET.acquire(_REQUEST_WEIGHTS.get(payload["type"], _DEFAULT_WEIGHT))
     resp = client.post(HL_INFO_URL, json=payload, timeout=_TIMEOUT)
     resp.raise_for_status()
     return resp.json()
@@ -42,10 +127,15 @@ def fetch_meta_and_asset_ctxs(client: httpx.Client) -> tuple[dict, list[dict]]:
 
 
 def fetch_candles(
-    client: httpx.Client, coin: str, interval: str, lookback_ms: int
+    client: httpx.Client,
+    coin: str,
+    interval: str,
+    lookback_ms: int,
+    end_time: int | None = None,
 ) -> list[dict]:
-    """Fetch candles for a given interval and lookback period."""
-    end_time = int(time.time() * 1000)
+    """Fetch candles for a given interval and lookback period ending at end_time (ms)."""
+    if end_time is None:
+        end_time = int(time.time() * 1000)
     start_time = end_time - lookback_ms
     return _post(
         client,
@@ -67,24 +157,41 @@ def collect_snapshot(client: httpx.Client) -> dict:
     API calls per cycle:
     1. metaAndAssetCtxs (1 call) — funding, OI, mark for ALL assets
     2. allMids (1 call) — mid prices for ALL assets
-    3. Per asset (5 calls each):
+    3. Per asset (1 + T calls each, T = len(CANDLE_TIMEFRAMES)):
        - l2Book
-       - 15m candles (20 bars = 5h)
-       - 1h candles (24 bars = 24h)
-       - 4h candles (30 bars = 5 days)
-       - 1d candles (7 bars = 7 days)
+       - one candleSnapshot per configured timeframe; defaults:
+         15m (20 bars = 5h), 1h (24 bars = 24h), 4h (30 bars = 5 days),
+         1d (7 bars = 7 days)
 
-    Total: 2 + 5*N calls. For BTC+ETH = 12 calls/60s.
+    Total: 2 + (1+T)*N calls. Defaults with BTC+ETH = 12 calls/60s.
+    All calls are issued concurrently; the cycle waits on the slowest one.
     """
-    ts = datetime.now(timezone.utc).isoformat()
+    now = datetime.now(timezone.utc)
+    ts = now.isoformat()
+    ts_ms = int(now.timestamp() * 1000)
+    # One anchor for every candle window so series are comparable across assets
+    end_time = int(time.time() * 1000)
+
+    # Fan out every request of the cycle at once; httpx.Client is thread-safe
+    # and shares one connection pool across workers.
+    with ThreadPoolExecutor(max_workers=_MAX_WORKERS) as pool:
+        meta_fut = pool.submit(fetch_meta_and_asset_ctxs, client)
+        mids_fut = pool.submit(fetch_all_mids, client)
+        book_futs = {sym: pool.submit(fetch_l2_book, client, sym) for sym in ASSETS}
+        candle_futs = {
+            (sym, interval): pool.submit(
+                fetch_candles, client, sym, interval, lookback_ms, end_time
+            )
+            for sym in ASSETS
+            for interval, lookback_ms in _CANDLE_CFG
+        }
 
-    meta, asset_ctxs = fetch_meta_and_asset_ctxs(client)
-    all_mids = fetch_all_mids(client)
+        meta, asset_ctxs = meta_fut.result()
+        all_mids = mids_fut.result()
 
-    universe = meta.get("universe", [])
-    sym_to_idx = {u["name"]: i for i, u in enumerate(universe)}
+    sym_to_idx = _symbol_index(meta.get("universe", []))
 
-    snapshot = {"timestamp": ts, "assets": {}}
+    snapshot = {"timestamp": ts, "ts_ms": ts_ms, "assets": {}}
 
     for symbol in ASSETS:
         if symbol not in sym_to_idx:
@@ -96,23 +203,16 @@ def collect_snapshot(client: httpx.Client) -> dict:
 
         # L2 book
         try:
-            book_raw = fetch_l2_book(client, symbol)
-            book = _parse_book(book_raw)
+            book = _parse_book(book_futs[symbol].result())
         except Exception as e:
             log.warning(f"L2 book failed {symbol}: {e}")
             book = None
 
         # Candles at multiple timeframes
         candles = {}
-        candle_configs = {
-            "15m": (20, 20 * 15 * 60 * 1000),      # 20 bars = 5h
-            "1h":  (24, 24 * 60 * 60 * 1000),       # 24 bars = 24h
-            "4h":  (30, 30 * 4 * 60 * 60 * 1000),   # 30 bars = 5 days
-            "1d":  (7,  7 * 24 * 60 * 60 * 1000),   # 7 bars = 7 days
-        }
-        for interval, (_, lookback_ms) in candle_configs.items():
+        for interval, _ in _CANDLE_CFG:
             try:
-                candles[interval] = fetch_candles(client, symbol, interval, lookback_ms)
+                candles[interval] = candle_futs[(symbol, interval)].result()
             except Exception as e:
                 log.warning(f"Candle {interval} failed {symbol}: {e}")
                 candles[interval] = []
@@ -127,15 +227,24 @@ def collect_snapshot(client: httpx.Client) -> dict:
             "day_ntl_vlm": _float(ctx.get("dayNtlVlm")),
             "prev_day_px": _float(ctx.get("prevDayPx")),
             "orderbook": book,
-            "candles_15m": candles.get("15m", []),
-            "candles_1h": candles.get("1h", []),
-            "candles_4h": candles.get("4h", []),
-            "candles_1d": candles.get("1d", []),
+            **{f"candles_{interval}": c for interval, c in candles.items()},
         }
 
     return snapshot
 
 
+def _symbol_index(universe: list[dict]) -> dict[str, int]:
+    now = time.monotonic()
+    if (
+        now - _universe_cache["ts"] > _UNIVERSE_TTL_SECONDS
+        or len(universe) != _universe_cache["size"]
+    ):
+        _universe_cache["sym_to_idx"] = {u["name"]: i for i, u in enumerate(universe)}
+        _universe_cache["size"] = len(universe)
+        _universe_cache["ts"] = now
+    return _universe_cache["sym_to_idx"]
+
+
 def _float(v) -> float | None:
     if v is None:
         return None
@@ -146,9 +255,16 @@ def _float(v) -> float | None:
 
 
 def _parse_book(raw: dict) -> dict | None:
+    """Columnar book: parallel px/sz/n lists per side (best level first)."""
     levels = raw.get("levels")
     if not levels or len(levels) < 2:
         return None
-    bids = [{"px": float(l["px"]), "sz": float(l["sz"]), "n": l.get("n", 0)} for l in levels[0]]
-    asks = [{"px": float(l["px"]), "sz": float(l["sz"]), "n": l.get("n", 0)} for l in levels[1]]
-    return {"bids": bids, "asks": asks}
\ No newline at end of file
+    bids, asks = levels[0], levels[1]
+    return {
+        "bid_px": [float(l["px"]) for l in bids],
+        "bid_sz": [float(l["sz"]) for l in bids],
+        "bid_n": [l.get("n", 0) for l in bids],
+        "ask_px": [float(l["px"]) for l in asks],
+        "ask_sz": [float(l["sz"]) for l in asks],
+        "ask_n": [l.get("n", 0) for l in asks],
+    }
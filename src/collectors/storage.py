@@ -1,12 +1,17 @@
-"""SQLite storage for market snapshots."""
+"""SQLite storage for market snapshots (plus the intraday signal log and LLM outputs)."""
 
 from __future__ import annotations
 
-import json
 import logging
+import queue
 import sqlite3
+import threading
+import zlib
+from collections.abc import Sequence
 from pathlib import Path
 
+import orjson
+
 from src.config import DB_PATH
 
 log = logging.getLogger(__name__)
@@ -15,35 +20,188 @@ _DDL = """
 CREATE TABLE IF NOT EXISTS snapshots (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     timestamp TEXT NOT NULL,
-    data TEXT NOT NULL
+    data BLOB NOT NULL,
+    codec TEXT NOT NULL DEFAULT 'json'
 );
 CREATE INDEX IF NOT EXISTS idx_snapshots_ts ON snapshots(timestamp);
+
+CREATE TABLE IF NOT EXISTS signals (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts_ms INTEGER NOT NULL,
+    asset TEXT NOT NULL,
+    event TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_signals_ts ON signals(ts_ms);
+
+CREATE TABLE IF NOT EXISTS llm_outputs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    ts_ms INTEGER,  -- epoch ms when the analysis was stored, not the snapshot time
+    errors TEXT NOT NULL,
+    usage TEXT,
+    raw BLOB NOT NULL
+);
 """
 
+# WAL lets readers (analyze/status) run alongside the collector, and with
+# synchronous=NORMAL a commit no longer fsyncs the main DB file.
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+)
+
+# Snapshot JSON repeats the same keys per candle/level and compresses ~10x.
+# Rows written before compression was added keep codec='json'.
+_CODEC = "zlib"
+_ZLIB_LEVEL = 6
+
+# Most snapshots the background writer commits in one transaction.
+_WRITER_BATCH = 32
+_STOP = object()
+
 
 def get_conn() -> sqlite3.Connection:
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
     conn = sqlite3.connect(str(DB_PATH))
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
     conn.executescript(_DDL)
+    _migrate(conn)
     return conn
 
 
-def store_snapshot(conn: sqlite3.Connection, snapshot: dict) -> None:
-    conn.execute(
-        "INSERT INTO snapshots (timestamp, data) VALUES (?, ?)",
-        (snapshot["timestamp"], json.dumps(snapshot)),
+def _migrate(conn: sqlite3.Connection) -> None:
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(snapshots)")}
+    if "codec" not in cols:
+        conn.execute("ALTER TABLE snapshots ADD COLUMN codec TEXT NOT NULL DEFAULT 'json'")
+        conn.commit()
+
+
+def store_snapshots(conn: sqlite3.Connection, snapshots: list[dict]) -> None:
+    """Insert a batch of snapshots in one transaction (one commit per batch)."""
+    conn.executemany(
+        "INSERT INTO snapshots (timestamp, data, codec) VALUES (?, ?, ?)",
+        [
+            (s["timestamp"], zlib.compress(orjson.dumps(s), _ZLIB_LEVEL), _CODEC)
+            for s in snapshots
+        ],
     )
     conn.commit()
 
 
+class SnapshotWriter:
+    """Stores snapshots on a background thread so the poll loop never waits on a commit.
+
+    The thread owns its own connection (sqlite3 connections must not be shared
+    across threads) and drains whatever is queued into one transaction.
+    """
+
+    def __init__(self) -> None:
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, snapshot: dict) -> None:
+        # A dead writer would let the queue grow without bound while the
+        # caller believes its snapshots are stored
+        if not self._thread.is_alive():
+            raise RuntimeError("Snapshot writer thread is not running")
+        self._queue.put(snapshot)
+
+    def close(self) -> None:
+        """Flush everything queued so far, then stop the thread."""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self) -> None:
+        try:
+            conn = get_conn()
+        except Exception as e:
+            log.error(f"Snapshot writer could not open {DB_PATH}: {e}")
+            return
+        try:
+            stop = False
+            while not stop:
+                batch = [self._queue.get()]
+                while len(batch) < _WRITER_BATCH:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if _STOP in batch:
+                    stop = True
+                    batch = [s for s in batch if s is not _STOP]
+                if not batch:
+                    continue
+                try:
+                    store_snapshots(conn, batch)
+                except Exception as e:
+                    log.error(f"Failed to store {len(batch)} snapshot(s): {e}", exc_info=True)
+        finally:
+            conn.close()
+
+
 def get_latest_snapshots(conn: sqlite3.Connection, n: int = 60) -> list[dict]:
     """Retrieve the last N snapshots (most recent first)."""
     rows = conn.execute(
-        "SELECT data FROM snapshots ORDER BY id DESC LIMIT ?", (n,)
+        "SELECT data, codec FROM snapshots ORDER BY id DESC LIMIT ?", (n,)
     ).fetchall()
-    return [json.loads(r[0]) for r in rows]
+    return [_decode(data, codec) for data, codec in rows]
 
 
 def get_snapshot_count(conn: sqlite3.Connection) -> int:
-    row = conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()
-    return row[0] if row else 0
+    """Number of stored snapshots.
+
+    Snapshots are never deleted, so MAX(id) equals COUNT(*) but is a single
+    rowid b-tree lookup instead of a full scan.
+    """
+    row = conn.execute("SELECT MAX(id) FROM snapshots").fetchone()
+    return row[0] or 0
+
+
+def store_llm_output(
+    conn: sqlite3.Connection,
+    timestamp: str,
+    ts_ms: int | None,
+    raw: str,
+    errors: Sequence[str],
+    usage: dict | None,
+) -> None:
+    """Record one validated LLM response; the raw text is stored zlib-compressed."""
+    conn.execute(
+        "INSERT INTO llm_outputs (timestamp, ts_ms, errors, usage, raw) VALUES (?, ?, ?, ?, ?)",
+        (
+            timestamp,
+            ts_ms,
+            orjson.dumps(errors).decode(),
+            orjson.dumps(usage).decode() if usage is not None else None,
+            zlib.compress(raw.encode(), _ZLIB_LEVEL),
+        ),
+    )
+    conn.commit()
+
+
+def get_latest_llm_output(conn: sqlite3.Connection) -> dict | None:
+    """Most recent LLM output record, or None if none were stored yet."""
+    row = conn.execute(
+        "SELECT timestamp, ts_ms, errors, usage, raw FROM llm_outputs ORDER BY id DESC LIMIT 1"
+    ).fetchone()
+    if row is None:
+        return None
+    timestamp, ts_ms, errors, usage, raw = row
+    return {
+        "timestamp": timestamp,
+        "ts_ms": ts_ms,
+        "raw": zlib.decompress(raw).decode(),
+        "errors": orjson.loads(errors),
+        "usage": orjson.loads(usage) if usage is not None else None,
+    }
+
+
+def _decode(data: bytes | str, codec: str) -> dict:
+    if codec == "zlib":
+        return orjson.loads(zlib.decompress(data))
+    return orjson.loads(data)
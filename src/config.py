@@ -10,8 +10,17 @@ _ROOT = Path(__file__).resolve().parent.parent
 load_dotenv(_ROOT / ".env")
 
 
-def _csv(key: str, default: str = "") -> list[str]:
-    return [s.strip() for s in os.getenv(key, default).split(",") if s.strip()]
+def _csv(key: str, default: str = "") -> tuple[str, ...]:
+    return tuple(filter(None, map(str.strip, os.getenv(key, default).split(","))))
+
+
+def _timeframes(key: str, default: str) -> tuple[tuple[str, int], ...]:
+    """Parse "15m:20,1h:24" into (("15m", 20), ("1h", 24))."""
+    out = []
+    for item in _csv(key, default):
+        interval, _, bars = item.partition(":")
+        out.append((interval.strip(), int(bars)))
+    return tuple(out)
 
 
 # --- LLM ---
@@ -21,19 +30,36 @@ LLM_TEMPERATURE: float = float(os.getenv("LLM_TEMPERATURE", "0.1"))
 LLM_MAX_TOKENS: int = int(os.getenv("LLM_MAX_TOKENS", "4000"))
 OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
 ANTHROPIC_API_KEY: str = os.getenv("ANTHROPIC_API_KEY", "")
+# Reuse a stored response for an identical prompt within this window (0 = off)
+LLM_CACHE_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", "0"))
+# Fail at startup if the system prompt is too short for provider prompt caching
+VERIFY_PROMPT_CACHEABILITY: bool = os.getenv("VERIFY_PROMPT_CACHEABILITY", "").lower() in ("1", "true", "yes")
+
+# --- Features ---
+# Intraday signal tracking (collect) and the signals section of the prompt (analyze)
+ENABLE_SIGNALS: bool = os.getenv("ENABLE_SIGNALS", "true").lower() in ("1", "true", "yes")
+# Previous-analysis summary in the prompt
+ENABLE_ANCHORING: bool = os.getenv("ENABLE_ANCHORING", "true").lower() in ("1", "true", "yes")
 
 # --- Assets ---
-ASSETS: list[str] = _csv("ASSETS", "BTC,ETH")
+ASSETS: tuple[str, ...] = _csv("ASSETS", "BTC,ETH")
 
 # --- Risk ---
 EQUITY_USD: float = float(os.getenv("EQUITY_USD", "10000"))
 MAX_RISK_PER_TRADE_PCT: float = float(os.getenv("MAX_RISK_PER_TRADE_PCT", "1.0"))
 MAX_TOTAL_RISK_PCT: float = float(os.getenv("MAX_TOTAL_RISK_PCT", "2.0"))
+MAX_LOSS_PER_TRADE_USD: float = EQUITY_USD * MAX_RISK_PER_TRADE_PCT / 100
+MAX_TOTAL_RISK_USD: float = EQUITY_USD * MAX_TOTAL_RISK_PCT / 100
 MIN_LEVERAGE: int = int(os.getenv("MIN_LEVERAGE", "1"))
 MAX_LEVERAGE: int = int(os.getenv("MAX_LEVERAGE", "6"))
 
 # --- Collection ---
 POLL_INTERVAL_SECONDS: int = int(os.getenv("POLL_INTERVAL_SECONDS", "60"))
+# Candle timeframes fetched per asset each cycle, as interval:bars.
+# The feature engine reads 15m, 1h, 4h and 1d; dropping one disables its features.
+CANDLE_TIMEFRAMES: tuple[tuple[str, int], ...] = _timeframes(
+    "CANDLE_TIMEFRAMES", "15m:20,1h:24,4h:30,1d:7"
+)
 
 # --- DB ---
 DB_PATH: Path = _ROOT / os.getenv("DB_PATH", "data/snapshots.db")
@@ -43,3 +69,5 @@ LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
 
 # --- Hyperliquid ---
 HL_INFO_URL: str = "https://api.hyperliquid.xyz/info"
+# Client-side request-weight budget; stays under HL's 1200/min IP limit.
+HL_WEIGHT_PER_MINUTE: int = int(os.getenv("HL_WEIGHT_PER_MINUTE", "1100"))
@@ -3,6 +3,10 @@
 from __future__ import annotations
 
 import json
+import sys
+from collections.abc import Sequence
+
+from src.llm.payload import compact
 from src.models.llm_output import LLMOutput
 from src.models.market_state import MarketState
 
@@ -23,147 +27,166 @@ def _fmt_price(v: float) -> str:
         return f"{v:>10.8f}"
 
 
+_RULE = "=" * 70
+_THIN_RULE = "─" * 70
+
+_ASSET_ROW_FMT = "\n  {sym:>5}  mid={mid}  mark={mark}  spread={spread:.1f}bps  imb={imb:+.2f}"
+_LEVELS_FMT = "         dayH={day_high}  dayL={day_low}  vwap={vwap}"
+_PRIOR_DAY_FMT = "         pdH={high}  pdL={low}  pdC={close}"
+_PIVOT_FMT = "         PP={pp}  R1={r1}  S1={s1}"
+_PIVOT2_FMT = "         R2={r2}  S2={s2}"
+_WEEK_FMT = "         wkH={high}  wkL={low}"
+_RET_FMT = "         ret: 1m={r1m} 5m={r5m} 15m={r15m} 1h={r1h} 4h={r4h}"
+_ATR_FMT = "         atr: 15m={a15m:>8.2f}  1h={a1h:>8.2f}  4h={a4h:>8.2f}"
+_FUNDING_FMT = "         funding={rate:+.6f} ({trend})  OI={oi:,.0f}  OIΔ1h={oi_delta:+,.0f}"
+_RISK_FMT = (
+    "\n  Risk: equity=${equity:,.0f}  max/trade=${per_trade:,.0f}  "
+    "max/total=${total:,.0f}  lev={min_lev}-{max_lev}x"
+)
+
+_NO_TRADE_FMT = "\n  #{rank} {label:>10}  playbook={playbook}  conf={conf}/100"
+_SETUP_HEAD_FMT = "\n  #{rank} {arrow} {direction:>5} {asset}  playbook={playbook}  conf={conf}/100"
+_ENTRY_FMT = "    Entry: {style} @ trigger={trigger:,.2f}  zone=[{low:,.2f}, {high:,.2f}]"
+_STOP_FMT = "    Stop:  {level:,.2f} ({why})"
+_RISK_ROW_FMT = (
+    "    Risk:  {pct:.1f}% equity  maxloss=${max_loss:,.0f}  lev={lev}x  "
+    "notional=${notional:,.0f}  R:R={rr:.1f}"
+)
+_TIME_FMT = "    Time:  cancel={cancel}min  stop={stop}min  horizon={h0}-{h1}h"
+
+
+def _emit(lines: list[str]) -> None:
+    """Write a whole render in one call instead of one print() per line."""
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
 def print_market_state(state: MarketState) -> None:
-    print(f"\n{'='*70}")
-    print(f"  MARKET STATE  |  {state.timestamp}")
-    print(f"{'='*70}")
+    lines = [f"\n{_RULE}", f"  MARKET STATE  |  {state.timestamp}", _RULE]
 
     for a in state.assets:
-        spread = a.orderbook.spread_bps
-        imb = a.orderbook.imbalance
-        print(
-            f"\n  {a.symbol:>5}  "
-            f"mid={_fmt_price(a.price.mid)}  "
-            f"mark={_fmt_price(a.price.mark)}  "
-            f"spread={spread:.1f}bps  "
-            f"imb={imb:+.2f}"
-        )
+        lines.append(_ASSET_ROW_FMT.format(
+            sym=a.symbol, mid=_fmt_price(a.price.mid), mark=_fmt_price(a.price.mark),
+            spread=a.orderbook.spread_bps, imb=a.orderbook.imbalance,
+        ))
 
         kl = a.key_levels
-        print(
-            f"         dayH={_fmt_price(kl.day_high)}  "
-            f"dayL={_fmt_price(kl.day_low)}  "
-            f"vwap={_fmt_price(kl.vwap or 0)}"
-        )
+        lines.append(_LEVELS_FMT.format(
+            day_high=_fmt_price(kl.day_high), day_low=_fmt_price(kl.day_low),
+            vwap=_fmt_price(kl.vwap or 0),
+        ))
         if kl.prior_day_high:
-            print(
-                f"         pdH={_fmt_price(kl.prior_day_high)}  "
-                f"pdL={_fmt_price(kl.prior_day_low or 0)}  "
-                f"pdC={_fmt_price(kl.prior_day_close or 0)}"
-            )
+            lines.append(_PRIOR_DAY_FMT.format(
+                high=_fmt_price(kl.prior_day_high), low=_fmt_price(kl.prior_day_low or 0),
+                close=_fmt_price(kl.prior_day_close or 0),
+            ))
         if kl.pivot_pp:
-            print(
-                f"         PP={_fmt_price(kl.pivot_pp)}  "
-                f"R1={_fmt_price(kl.pivot_r1)}  "
-                f"S1={_fmt_price(kl.pivot_s1)}"
-            )
-            print(
-                f"         R2={_fmt_price(kl.pivot_r2)}  "
-                f"S2={_fmt_price(kl.pivot_s2)}"
-            )
+            lines.append(_PIVOT_FMT.format(
+                pp=_fmt_price(kl.pivot_pp), r1=_fmt_price(kl.pivot_r1),
+                s1=_fmt_price(kl.pivot_s1),
+            ))
+            lines.append(_PIVOT2_FMT.format(
+                r2=_fmt_price(kl.pivot_r2), s2=_fmt_price(kl.pivot_s2),
+            ))
         if kl.week_high:
-            print(
-                f"         wkH={_fmt_price(kl.week_high)}  "
-                f"wkL={_fmt_price(kl.week_low or 0)}"
-            )
+            lines.append(_WEEK_FMT.format(
+                high=_fmt_price(kl.week_high), low=_fmt_price(kl.week_low or 0),
+            ))
 
         b = a.bar_stats
-        print(
-            f"         ret: 1m={_pct(b.ret_1m)} 5m={_pct(b.ret_5m)} "
-            f"15m={_pct(b.ret_15m)} 1h={_pct(b.ret_1h)} 4h={_pct(b.ret_4h)}"
-        )
-        print(
-            f"         atr: 15m={b.atr_15m or 0:>8.2f}  "
-            f"1h={b.atr_1h or 0:>8.2f}  "
-            f"4h={b.atr_4h or 0:>8.2f}"
-        )
+        lines.append(_RET_FMT.format(
+            r1m=_pct(b.ret_1m), r5m=_pct(b.ret_5m), r15m=_pct(b.ret_15m),
+            r1h=_pct(b.ret_1h), r4h=_pct(b.ret_4h),
+        ))
+        lines.append(_ATR_FMT.format(
+            a15m=b.atr_15m or 0, a1h=b.atr_1h or 0, a4h=b.atr_4h or 0,
+        ))
 
         f = a.funding_oi
-        print(
-            f"         funding={f.funding_rate:+.6f} ({f.funding_trend or '?'})  "
-            f"OI={f.open_interest:,.0f}  "
-            f"OIΔ1h={f.oi_delta_1h or 0:+,.0f}"
-        )
+        lines.append(_FUNDING_FMT.format(
+            rate=f.funding_rate, trend=f.funding_trend or "?",
+            oi=f.open_interest, oi_delta=f.oi_delta_1h or 0,
+        ))
 
     rc = state.risk_context
-    print(f"\n  Risk: equity=${rc.equity_usd:,.0f}  "
-          f"max/trade=${rc.max_loss_per_trade_usd:,.0f}  "
-          f"max/total=${rc.max_total_risk_usd:,.0f}  "
-          f"lev={rc.min_leverage}-{rc.max_leverage}x")
-    print(f"{'='*70}\n")
-
-
-def print_setups(output: LLMOutput, errors: list[str]) -> None:
-    print(f"\n{'='*70}")
-    print(f"  TRADE PLAN  |  {output.timestamp}")
-    print(f"  Regime: {output.regime} — {output.regime_note}")
-    print(f"{'='*70}")
+    lines.append(_RISK_FMT.format(
+        equity=rc.equity_usd, per_trade=rc.max_loss_per_trade_usd,
+        total=rc.max_total_risk_usd, min_lev=rc.min_leverage, max_lev=rc.max_leverage,
+    ))
+    lines.append(f"{_RULE}\n")
+    _emit(lines)
+
+
+def print_setups(output: LLMOutput, errors: Sequence[str]) -> None:
+    lines = [
+        f"\n{_RULE}",
+        f"  TRADE PLAN  |  {output.timestamp}",
+        f"  Regime: {output.regime} — {output.regime_note}",
+        _RULE,
+    ]
 
     if output.no_trade_reason:
-        print(f"\n  ⚠ NO TRADE: {output.no_trade_reason}\n")
+        lines.append(f"\n  ⚠ NO TRADE: {output.no_trade_reason}\n")
 
     for s in output.setups:
-        _print_setup(s)
+        _setup_lines(s, lines)
 
     if errors:
-        print(f"\n{'─'*70}")
+        lines.append(f"\n{_THIN_RULE}")
         corrections = [e for e in errors if e.startswith("✓")]
         real_errors = [e for e in errors if not e.startswith("✓")]
         if corrections:
-            print(f"  ✓ AUTO-CORRECTIONS ({len(corrections)}):")
-            for c in corrections:
-                print(f"    {c}")
+            lines.append(f"  ✓ AUTO-CORRECTIONS ({len(corrections)}):")
+            lines.extend(f"    {c}" for c in corrections)
         if real_errors:
-            print(f"  ⚠ ISSUES ({len(real_errors)}):")
-            for e in real_errors:
-                print(f"    • {e}")
-        print(f"{'─'*70}")
-    print()
+            lines.append(f"  ⚠ ISSUES ({len(real_errors)}):")
+            lines.extend(f"    • {e}" for e in real_errors)
+        lines.append(_THIN_RULE)
+    lines.append("")
+    _emit(lines)
 
 
-def _print_setup(s) -> None:
+def _setup_lines(s, lines: list[str]) -> None:
     if s.direction == "no_trade":
-        print(f"\n  #{s.rank} {'NO TRADE':>10}  playbook={s.playbook}  "
-              f"conf={s.confidence}/100")
+        lines.append(_NO_TRADE_FMT.format(
+            rank=s.rank, label="NO TRADE", playbook=s.playbook, conf=s.confidence,
+        ))
         if s.red_flags:
-            print(f"    Reason: {'; '.join(s.red_flags)}")
+            lines.append(f"    Reason: {'; '.join(s.red_flags)}")
         return
 
-    arrow = "▲" if s.direction == "long" else "▼"
-    print(
-        f"\n  #{s.rank} {arrow} {s.direction.upper():>5} {s.asset}  "
-        f"playbook={s.playbook}  conf={s.confidence}/100"
-    )
-    print(
-        f"    Entry: {s.entry.entry_style} @ trigger={s.entry.levels.trigger:,.2f}  "
-        f"zone=[{s.entry.levels.retest_zone_low:,.2f}, "
-        f"{s.entry.levels.retest_zone_high:,.2f}]"
-    )
-    print(f"    Stop:  {s.stop.level:,.2f} ({s.stop.why})")
+    lines.append(_SETUP_HEAD_FMT.format(
+        rank=s.rank, arrow="▲" if s.direction == "long" else "▼",
+        direction=s.direction.upper(), asset=s.asset, playbook=s.playbook,
+        conf=s.confidence,
+    ))
+    lv = s.entry.levels
+    lines.append(_ENTRY_FMT.format(
+        style=s.entry.entry_style, trigger=lv.trigger,
+        low=lv.retest_zone_low, high=lv.retest_zone_high,
+    ))
+    lines.append(_STOP_FMT.format(level=s.stop.level, why=s.stop.why))
     tp_str = "  ".join(
         f"TP{i+1}={tp.level:,.2f}({tp.pct}%)" for i, tp in enumerate(s.take_profits)
     )
-    print(f"    TPs:   {tp_str}")
-    print(
-        f"    Risk:  {s.risk.risk_pct_equity:.1f}% equity  "
-        f"maxloss=${s.risk.max_loss_usd:,.0f}  "
-        f"lev={s.risk.recommended_leverage}x  "
-        f"notional=${s.risk.position_notional_usd:,.0f}  "
-        f"R:R={s.risk.rr_to_tp1:.1f}"
-    )
-    print(
-        f"    Time:  cancel={s.risk.cancel_if_not_triggered_minutes}min  "
-        f"stop={s.risk.time_stop_minutes}min  "
-        f"horizon={s.time_horizon_hours[0]}-{s.time_horizon_hours[1]}h"
-    )
+    lines.append(f"    TPs:   {tp_str}")
+    r = s.risk
+    lines.append(_RISK_ROW_FMT.format(
+        pct=r.risk_pct_equity, max_loss=r.max_loss_usd, lev=r.recommended_leverage,
+        notional=r.position_notional_usd, rr=r.rr_to_tp1,
+    ))
+    lines.append(_TIME_FMT.format(
+        cancel=r.cancel_if_not_triggered_minutes, stop=r.time_stop_minutes,
+        h0=s.time_horizon_hours[0], h1=s.time_horizon_hours[1],
+    ))
     if s.invalidations:
-        print(f"    Invalidations: {'; '.join(s.invalidations[:3])}")
+        lines.append(f"    Invalidations: {'; '.join(s.invalidations[:3])}")
     if s.red_flags:
-        print(f"    Red flags: {'; '.join(s.red_flags[:3])}")
+        lines.append(f"    Red flags: {'; '.join(s.red_flags[:3])}")
 
 
 def print_market_state_json(state: MarketState) -> None:
-    print(json.dumps(state.model_dump(), indent=2, default=str))
+    """The Market State as sent to the LLM (compacted)."""
+    print(json.dumps(compact(state.model_dump()), indent=2, default=str))
 
 
 def _pct(v: float | None) -> str:
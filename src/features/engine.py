@@ -1,17 +1,20 @@
 """Feature engine: converts raw snapshots → structured MarketState.
 
 V2: Multi-timeframe candles, floor pivots, funding trend, proper prior-day levels.
+Values are kept at full precision; rounding happens when the payload is built
+for the LLM (src/llm/payload.py) and in display formatting.
 """
 
 from __future__ import annotations
 
+import bisect
 import logging
 
 from src.config import (
     ASSETS,
     EQUITY_USD,
-    MAX_RISK_PER_TRADE_PCT,
-    MAX_TOTAL_RISK_PCT,
+    MAX_LOSS_PER_TRADE_USD,
+    MAX_TOTAL_RISK_USD,
     MIN_LEVERAGE,
     MAX_LEVERAGE,
 )
@@ -29,6 +32,26 @@ from src.models.market_state import (
 
 log = logging.getLogger(__name__)
 
+# Snapshot mids needed for ret_1m/5m/15m (current + 15 back)
+_MID_WINDOW = 16
+
+# Risk limits come straight from config and never vary between calls
+_RISK_CTX = RiskContext(
+    equity_usd=EQUITY_USD,
+    max_loss_per_trade_usd=MAX_LOSS_PER_TRADE_USD,
+    max_total_risk_usd=MAX_TOTAL_RISK_USD,
+    min_leverage=MIN_LEVERAGE,
+    max_leverage=MAX_LEVERAGE,
+)
+
+# Candle timeframes the features read, parsed once per asset into Candle rows
+_CANDLE_INTERVALS = ("15m", "1h", "4h", "1d")
+Candle = tuple[float, float, float, float]  # (high, low, close, volume)
+
+# Orderbook depth bands as fractions of the best price (0.1% and 0.5%)
+_DEPTH_NEAR = 0.1 / 100
+_DEPTH_WIDE = 0.5 / 100
+
 
 def build_market_state(snapshots: list[dict]) -> MarketState | None:
     """Build MarketState from recent snapshots (newest-first order)."""
@@ -36,17 +59,24 @@ def build_market_state(snapshots: list[dict]) -> MarketState | None:
         log.error("No snapshots available")
         return None
 
-    latest = snapshots[0]
-    ts = latest["timestamp"]
+    ts = snapshots[0]["timestamp"]
+
+    # Per-symbol view of the history (newest-first), so helpers index a list
+    # instead of re-walking snapshot["assets"][symbol] for every lookup.
+    by_symbol = {
+        symbol: [snap.get("assets", {}).get(symbol) for snap in snapshots]
+        for symbol in ASSETS
+    }
 
     assets: list[AssetState] = []
     for symbol in ASSETS:
-        asset_data = latest.get("assets", {}).get(symbol)
+        asset_snaps = by_symbol[symbol]
+        asset_data = asset_snaps[0]
         if not asset_data:
             log.warning(f"No data for {symbol} in latest snapshot")
             continue
 
-        asset_state = _build_asset_state(symbol, ts, asset_data, snapshots)
+        asset_state = _build_asset_state(symbol, ts, asset_data, asset_snaps)
         if asset_state:
             assets.append(asset_state)
 
@@ -54,19 +84,11 @@ def build_market_state(snapshots: list[dict]) -> MarketState | None:
         log.error("No valid asset states built")
         return None
 
-    risk_ctx = RiskContext(
-        equity_usd=EQUITY_USD,
-        max_loss_per_trade_usd=EQUITY_USD * MAX_RISK_PER_TRADE_PCT / 100,
-        max_total_risk_usd=EQUITY_USD * MAX_TOTAL_RISK_PCT / 100,
-        min_leverage=MIN_LEVERAGE,
-        max_leverage=MAX_LEVERAGE,
-    )
-
-    return MarketState(timestamp=ts, assets=assets, risk_context=risk_ctx)
+    return MarketState(timestamp=ts, assets=assets, risk_context=_RISK_CTX)
 
 
 def _build_asset_state(
-    symbol: str, ts: str, data: dict, snapshots: list[dict]
+    symbol: str, ts: str, data: dict, asset_snaps: list[dict | None]
 ) -> AssetState | None:
     mark = data.get("mark") or data.get("mid")
     mid = data.get("mid") or mark
@@ -74,17 +96,19 @@ def _build_asset_state(
         return None
 
     price = PriceData(mark=mark, mid=mid, last=mid)
-    bar_stats = _compute_bar_stats(symbol, data, snapshots)
-    key_levels = _compute_key_levels(symbol, data)
+    # Parse each candle list once; every consumer below reads the float rows
+    candles = {iv: _parse_candles(data.get(f"candles_{iv}", [])) for iv in _CANDLE_INTERVALS}
+    bar_stats = _compute_bar_stats(asset_snaps, candles)
+    key_levels = _compute_key_levels(data, candles)
     orderbook = _compute_orderbook_state(data.get("orderbook"), mid)
 
     # Flow proxy from orderbook imbalance
     flow = FlowData(aggressive_buy_ratio=None, signed_volume_delta=None)
     if orderbook:
         ratio = max(0.0, min(1.0, 0.5 + (orderbook.imbalance * 0.5)))
-        flow = FlowData(aggressive_buy_ratio=round(ratio, 3), signed_volume_delta=None)
+        flow = FlowData(aggressive_buy_ratio=ratio, signed_volume_delta=None)
 
-    funding_oi = _compute_funding_oi(symbol, data, snapshots)
+    funding_oi = _compute_funding_oi(data, asset_snaps)
 
     if orderbook is None:
         orderbook = OrderbookState(
@@ -101,33 +125,35 @@ def _build_asset_state(
 
 # ---------- BAR STATS ----------
 
-def _compute_bar_stats(symbol: str, data: dict, snapshots: list[dict]) -> BarStats:
+def _compute_bar_stats(asset_snaps: list[dict | None], candles: dict[str, list[Candle]]) -> BarStats:
     """Compute returns from snapshot history + ATR from multi-TF candles."""
-    # Returns from snapshot mids (60s apart)
+    # Returns from snapshot mids (60s apart). The longest horizon is 15 back,
+    # so only the first _MID_WINDOW valid mids are ever needed.
     mids = []
-    for snap in snapshots:
-        m = snap.get("assets", {}).get(symbol, {}).get("mid")
+    for a in asset_snaps:
+        m = a.get("mid") if a else None
         if m:
             mids.append(m)
+            if len(mids) == _MID_WINDOW:
+                break
 
     ret_1m = ret_5m = ret_15m = None
     if len(mids) >= 2:
         current = mids[0]
-        def _ret(idx):
-            i = min(idx, len(mids) - 1)
-            return round((current - mids[i]) / mids[i] * 100, 4) if mids[i] else None
-        ret_1m = _ret(1)
-        ret_5m = _ret(5)
-        ret_15m = _ret(15)
+        last = len(mids) - 1
+        ret_1m, ret_5m, ret_15m = (
+            (current - mids[i]) / mids[i] * 100
+            for i in (min(1, last), min(5, last), min(15, last))
+        )
 
     # Returns from candle closes for longer TFs
-    ret_1h = _return_from_candles(data.get("candles_1h", []), 1)
-    ret_4h = _return_from_candles(data.get("candles_4h", []), 1)
+    ret_1h = _return_from_candles(candles["1h"], 1)
+    ret_4h = _return_from_candles(candles["4h"], 1)
 
     # ATR from each timeframe
-    atr_15m = _compute_atr(data.get("candles_15m", []), 14)
-    atr_1h = _compute_atr(data.get("candles_1h", []), 14)
-    atr_4h = _compute_atr(data.get("candles_4h", []), 14)
+    atr_15m = _compute_atr(candles["15m"], 14)
+    atr_1h = _compute_atr(candles["1h"], 14)
+    atr_4h = _compute_atr(candles["4h"], 14)
 
     return BarStats(
         ret_1m=ret_1m, ret_5m=ret_5m, ret_15m=ret_15m,
@@ -136,90 +162,71 @@ def _compute_bar_stats(symbol: str, data: dict, snapshots: list[dict]) -> BarSta
     )
 
 
-def _return_from_candles(candles: list[dict], periods_back: int) -> float | None:
+def _return_from_candles(candles: list[Candle], periods_back: int) -> float | None:
     """Return % change from N candles back to latest."""
     if len(candles) < periods_back + 1:
         return None
-    current = float(candles[-1].get("c", 0))
-    prev = float(candles[-(periods_back + 1)].get("c", 0))
+    current = candles[-1][2]
+    prev = candles[-(periods_back + 1)][2]
     if not current or not prev:
         return None
-    return round((current - prev) / prev * 100, 4)
+    return (current - prev) / prev * 100
 
 
-def _compute_atr(candles: list[dict], period: int = 14) -> float | None:
-    """Compute ATR from candle data."""
+def _compute_atr(candles: list[Candle], period: int = 14) -> float | None:
+    """Compute ATR from candle data (mean true range over the last `period` candles)."""
     if not candles or len(candles) < 3:
         return None
-    trs = []
-    for i, c in enumerate(candles[-period:]):
-        h, l = float(c.get("h", 0)), float(c.get("l", 0))
-        if not h or not l:
-            continue
-        if i > 0:
-            prev_c = float(candles[max(0, len(candles) - period + i - 1)].get("c", 0))
-            if prev_c:
-                tr = max(h - l, abs(h - prev_c), abs(l - prev_c))
-            else:
-                tr = h - l
-        else:
+    total = 0.0
+    count = 0
+    prev_c = 0.0  # first candle in the window has no previous close: TR = H - L
+    for h, l, close, _ in candles[-period:]:
+        if h and l:
             tr = h - l
-        trs.append(tr)
-    if not trs:
+            if prev_c:
+                tr = max(tr, abs(h - prev_c), abs(l - prev_c))
+            total += tr
+            count += 1
+        prev_c = close
+    if not count:
         return None
-    return round(sum(trs) / len(trs), 4)
+    return total / count
 
 
 # ---------- KEY LEVELS ----------
 
-def _compute_key_levels(symbol: str, data: dict) -> KeyLevels:
+def _compute_key_levels(data: dict, candles: dict[str, list[Candle]]) -> KeyLevels:
     """Compute key levels from multi-TF candle data."""
     mid = data.get("mid") or data.get("mark") or 0
-    candles_15m = data.get("candles_15m", [])
-    candles_1d = data.get("candles_1d", [])
-
-    # Intraday high/low from 15m candles
-    day_high, day_low = mid, mid
-    if candles_15m:
-        highs = [float(c["h"]) for c in candles_15m if c.get("h")]
-        lows = [float(c["l"]) for c in candles_15m if c.get("l") and float(c["l"]) > 0]
-        if highs:
-            day_high = max(highs)
-        if lows:
-            day_low = min(lows)
+    candles_1d = candles["1d"]
+
+    # Intraday high/low and VWAP from 15m candles
+    day_high, day_low, vwap = _candle_stats(candles["15m"])
+    day_high = day_high or mid
+    day_low = day_low or mid
 
     # Prior day OHLC from daily candles
     prior_day_high = prior_day_low = prior_day_close = None
     pivot_pp = pivot_r1 = pivot_r2 = pivot_s1 = pivot_s2 = None
-    week_high = week_low = None
 
     if len(candles_1d) >= 2:
         # Second-to-last daily candle = prior day
-        prev = candles_1d[-2]
-        prior_day_high = float(prev.get("h", 0)) or None
-        prior_day_low = float(prev.get("l", 0)) or None
-        prior_day_close = float(prev.get("c", 0)) or None
+        h, l, c, _ = candles_1d[-2]
+        prior_day_high = h or None
+        prior_day_low = l or None
+        prior_day_close = c or None
 
         # Classic floor pivots: PP = (H + L + C) / 3
         if prior_day_high and prior_day_low and prior_day_close:
             pp = (prior_day_high + prior_day_low + prior_day_close) / 3
-            pivot_pp = round(pp, 2)
-            pivot_r1 = round(2 * pp - prior_day_low, 2)
-            pivot_s1 = round(2 * pp - prior_day_high, 2)
-            pivot_r2 = round(pp + (prior_day_high - prior_day_low), 2)
-            pivot_s2 = round(pp - (prior_day_high - prior_day_low), 2)
+            pivot_pp = pp
+            pivot_r1 = 2 * pp - prior_day_low
+            pivot_s1 = 2 * pp - prior_day_high
+            pivot_r2 = pp + (prior_day_high - prior_day_low)
+            pivot_s2 = pp - (prior_day_high - prior_day_low)
 
     # Week high/low from all daily candles
-    if candles_1d:
-        week_highs = [float(c["h"]) for c in candles_1d if c.get("h")]
-        week_lows = [float(c["l"]) for c in candles_1d if c.get("l") and float(c["l"]) > 0]
-        if week_highs:
-            week_high = max(week_highs)
-        if week_lows:
-            week_low = min(week_lows)
-
-    # VWAP from 15m candles
-    vwap = _compute_vwap(candles_15m)
+    week_high, week_low, _ = _candle_stats(candles_1d)
 
     return KeyLevels(
         day_high=day_high, day_low=day_low,
@@ -231,39 +238,75 @@ def _compute_key_levels(symbol: str, data: dict) -> KeyLevels:
     )
 
 
-def _compute_vwap(candles: list[dict]) -> float | None:
-    if not candles:
-        return None
+def _parse_candles(candles: list[dict]) -> list[Candle]:
+    """Candle dicts (string fields) → (high, low, close, volume) floats; missing = 0."""
+    return [
+        (float(c.get("h", 0)), float(c.get("l", 0)), float(c.get("c", 0)), float(c.get("v", 0)))
+        for c in candles
+    ]
+
+
+def _candle_stats(rows: list[Candle]) -> tuple[float | None, float | None, float | None]:
+    """(high, lowest positive low, VWAP) over parsed candles in one pass."""
+    high = low = None
     total_vp = 0.0
     total_v = 0.0
-    for c in candles:
-        h, l = float(c.get("h", 0)), float(c.get("l", 0))
-        close, vol = float(c.get("c", 0)), float(c.get("v", 0))
+    for h, l, close, vol in rows:
+        if h and (high is None or h > high):
+            high = h
+        if l > 0 and (low is None or l < low):
+            low = l
         if h and l and close and vol > 0:
-            total_vp += ((h + l + close) / 3) * vol
+            total_vp += (h + l + close) * vol  # typical price ×3; divided once below
             total_v += vol
-    if total_v == 0:
-        return None
-    return round(total_vp / total_v, 2)
+    vwap = total_vp / (3 * total_v) if total_v else None
+    return high, low, vwap
 
 
 # ---------- ORDERBOOK ----------
 
+def _book_sides(book: dict) -> tuple[list[float], list[float], list[float], list[float]]:
+    """Return (bid_px, bid_sz, ask_px, ask_sz) from a stored orderbook."""
+    if "bid_px" in book:
+        return book["bid_px"], book["bid_sz"], book["ask_px"], book["ask_sz"]
+    # Snapshots stored before the columnar layout: lists of level dicts
+    bids, asks = book.get("bids") or [], book.get("asks") or []
+    return (
+        [l["px"] for l in bids], [l["sz"] for l in bids],
+        [l["px"] for l in asks], [l["sz"] for l in asks],
+    )
+
+
+def _depth(pxs: list[float], szs: list[float], ref_px: float) -> tuple[float, float]:
+    """Notional within 0.1% and 0.5% of ref_px.
+
+    Each side is sorted away from the touch (bids descending, asks ascending),
+    so distance from ref_px grows along the list and each band is a prefix
+    whose end is found by binary search.
+    """
+    def dist(px: float) -> float:
+        return abs(px - ref_px) / ref_px
+
+    n_near = bisect.bisect_right(pxs, _DEPTH_NEAR, key=dist)
+    n_wide = bisect.bisect_right(pxs, _DEPTH_WIDE, lo=n_near, key=dist)
+    notional = [sz * px for px, sz in zip(pxs[:n_wide], szs[:n_wide])]
+    return sum(notional[:n_near]), sum(notional)
+
+
 def _compute_orderbook_state(book: dict | None, mid: float) -> OrderbookState | None:
-    if not book or not book.get("bids") or not book.get("asks"):
+    if not book:
         return None
-    bids, asks = book["bids"], book["asks"]
-    best_bid = bids[0]["px"] if bids else mid
-    best_ask = asks[0]["px"] if asks else mid
-    spread_bps = round((best_ask - best_bid) / best_bid * 10000, 2) if best_bid > 0 else 0
-
-    def _depth(levels, ref_px, pct):
-        return round(sum(l["sz"] * l["px"] for l in levels if abs(l["px"] - ref_px) / ref_px <= pct / 100), 2)
+    bid_px, bid_sz, ask_px, ask_sz = _book_sides(book)
+    if not bid_px or not ask_px:
+        return None
+    best_bid = bid_px[0]
+    best_ask = ask_px[0]
+    spread_bps = (best_ask - best_bid) / best_bid * 10000 if best_bid > 0 else 0
 
-    bid_d01, ask_d01 = _depth(bids, best_bid, 0.1), _depth(asks, best_ask, 0.1)
-    bid_d05, ask_d05 = _depth(bids, best_bid, 0.5), _depth(asks, best_ask, 0.5)
+    bid_d01, bid_d05 = _depth(bid_px, bid_sz, best_bid)
+    ask_d01, ask_d05 = _depth(ask_px, ask_sz, best_ask)
     total_near = bid_d01 + ask_d01
-    imbalance = round((bid_d01 - ask_d01) / total_near, 3) if total_near > 0 else 0
+    imbalance = (bid_d01 - ask_d01) / total_near if total_near > 0 else 0
 
     return OrderbookState(
         spread_bps=spread_bps, bid_depth_01pct=bid_d01, ask_depth_01pct=ask_d01,
@@ -274,24 +317,20 @@ def _compute_orderbook_state(book: dict | None, mid: float) -> OrderbookState |
 
 # ---------- FUNDING / OI ----------
 
-def _compute_funding_oi(symbol: str, data: dict, snapshots: list[dict]) -> FundingOI:
+def _compute_funding_oi(data: dict, asset_snaps: list[dict | None]) -> FundingOI:
     """Compute funding with trend from snapshot history."""
     current_funding = data.get("funding") or 0.0
     current_oi = data.get("open_interest") or 0.0
 
-    # OI delta from ~1h ago
+    # OI delta and funding from ~1h ago
     oi_delta = None
-    if len(snapshots) >= 2:
-        back_idx = min(60, len(snapshots) - 1)
-        old_oi = snapshots[back_idx].get("assets", {}).get(symbol, {}).get("open_interest")
-        if old_oi is not None:
-            oi_delta = round(current_oi - old_oi, 2)
-
-    # Funding from ~1h ago
     funding_1h_ago = None
-    if len(snapshots) >= 2:
-        back_idx = min(60, len(snapshots) - 1)
-        funding_1h_ago = snapshots[back_idx].get("assets", {}).get(symbol, {}).get("funding")
+    if len(asset_snaps) >= 2:
+        hour_ago = asset_snaps[min(60, len(asset_snaps) - 1)] or {}
+        old_oi = hour_ago.get("open_interest")
+        if old_oi is not None:
+            oi_delta = current_oi - old_oi
+        funding_1h_ago = hour_ago.get("funding")
 
     # Classify funding trend
     funding_trend = _classify_funding_trend(current_funding, funding_1h_ago)
@@ -1,32 +1,41 @@
 """Intraday signal tracker — records objective level tests and outcomes.
 
 Runs inside the collector loop, watches for key events, stores them
-in a compact format the LLM can consume as context.
+in the `signals` table (see collectors/storage.py) in a compact format
+the LLM can consume as context.
 """
 
 from __future__ import annotations
 
-import json
 import logging
+import sqlite3
 from datetime import datetime, timezone
-from pathlib import Path
 
-from src.config import DB_PATH
+import orjson
 
 log = logging.getLogger(__name__)
 
-SIGNALS_PATH = DB_PATH.parent.parent / "logs" / "signals_today.jsonl"
-
 # Thresholds
 LEVEL_PROXIMITY_PCT = 0.15  # within 0.15% of a level = "testing"
 
+# Prior-day level crossings, in emit order: (level name, daily candle field, upward?)
+_PRIOR_DAY_RULES = (
+    ("prior_day_high", "h", True),
+    ("prior_day_low", "l", False),
+    ("prior_day_close", "c", True),
+    ("prior_day_close", "c", False),
+)
+
 
-def track_signals(snapshot: dict, prev_snapshot: dict | None) -> None:
-    """Compare current snapshot to previous and record events."""
+def track_signals(
+    conn: sqlite3.Connection, snapshot: dict, prev_snapshot: dict | None
+) -> list[dict]:
+    """Compare current snapshot to previous, record events and return them."""
     if not prev_snapshot:
-        return
+        return []
 
     ts = snapshot["timestamp"]
+    ts_ms = snapshot.get("ts_ms") or int(datetime.fromisoformat(ts).timestamp() * 1000)
     signals = []
 
     for symbol, data in snapshot.get("assets", {}).items():
@@ -39,105 +48,104 @@ def track_signals(snapshot: dict, prev_snapshot: dict | None) -> None:
         if not mid or not prev_mid:
             continue
 
-        # Detect level breaks from candle data
-        candles_1d = data.get("candles_1d", [])
-        if len(candles_1d) >= 2:
-            prev_day = candles_1d[-2]
-            pd_high = float(prev_day.get("h", 0))
-            pd_low = float(prev_day.get("l", 0))
-            pd_close = float(prev_day.get("c", 0))
-
-            # Broke above prior day high
-            if prev_mid <= pd_high and mid > pd_high and pd_high > 0:
-                signals.append({
-                    "ts": ts, "asset": symbol, "event": "broke_above",
-                    "level": "prior_day_high", "price": round(mid, 2),
-                    "level_value": pd_high
-                })
-
-            # Broke below prior day low
-            if prev_mid >= pd_low and mid < pd_low and pd_low > 0:
-                signals.append({
-                    "ts": ts, "asset": symbol, "event": "broke_below",
-                    "level": "prior_day_low", "price": round(mid, 2),
-                    "level_value": pd_low
-                })
-
-            # Broke above prior day close
-            if prev_mid <= pd_close and mid > pd_close and pd_close > 0:
-                signals.append({
-                    "ts": ts, "asset": symbol, "event": "broke_above",
-                    "level": "prior_day_close", "price": round(mid, 2),
-                    "level_value": pd_close
-                })
-
-            # Broke below prior day close
-            if prev_mid >= pd_close and mid < pd_close and pd_close > 0:
-                signals.append({
-                    "ts": ts, "asset": symbol, "event": "broke_below",
-                    "level": "prior_day_close", "price": round(mid, 2),
-                    "level_value": pd_close
-                })
-
-        # Detect intraday high/low breaks from 15m candles
-        candles_15m = data.get("candles_15m", [])
-        if candles_15m:
-            highs = [float(c["h"]) for c in candles_15m[:-1] if c.get("h")]
-            lows = [float(c["l"]) for c in candles_15m[:-1] if c.get("l") and float(c["l"]) > 0]
-            if highs:
-                day_high = max(highs)
-                if prev_mid <= day_high and mid > day_high:
-                    signals.append({
-                        "ts": ts, "asset": symbol, "event": "new_day_high",
-                        "price": round(mid, 2), "level_value": round(day_high, 2)
-                    })
-            if lows:
-                day_low = min(lows)
-                if prev_mid >= day_low and mid < day_low:
-                    signals.append({
-                        "ts": ts, "asset": symbol, "event": "new_day_low",
-                        "price": round(mid, 2), "level_value": round(day_low, 2)
-                    })
-
-        # Detect large moves (> 1% in 5 minutes)
-        pct_change = (mid - prev_mid) / prev_mid * 100
-        if abs(pct_change) > 1.0:
-            signals.append({
-                "ts": ts, "asset": symbol,
-                "event": "large_move_up" if pct_change > 0 else "large_move_down",
-                "pct": round(pct_change, 3),
-                "price": round(mid, 2)
-            })
+        for event in _detect_events(prev_mid, mid, data):
+            signals.append({"ts": ts, "ts_ms": ts_ms, "asset": symbol, **event})
 
     # Write signals
     if signals:
-        SIGNALS_PATH.parent.mkdir(parents=True, exist_ok=True)
-        with open(SIGNALS_PATH, "a") as f:
-            for sig in signals:
-                f.write(json.dumps(sig) + "\n")
+        conn.executemany(
+            "INSERT INTO signals (ts_ms, asset, event, data) VALUES (?, ?, ?, ?)",
+            [(ts_ms, sig["asset"], sig["event"], orjson.dumps(sig)) for sig in signals],
+        )
+        conn.commit()
         log.debug(f"Recorded {len(signals)} signals")
+    return signals
+
+
+def _detect_events(prev_mid: float, mid: float, data: dict) -> list[dict]:
+    """Events for one asset between two ticks (no I/O, no timestamps).
+
+    Returns event fields in emit order; the caller adds ts/ts_ms/asset.
+    """
+    events = []
+    price = round(mid, 2)
+
+    # Level breaks from the prior daily candle
+    candles_1d = data.get("candles_1d", [])
+    if len(candles_1d) >= 2:
+        prev_day = candles_1d[-2]
+        for level, field, up in _PRIOR_DAY_RULES:
+            value = float(prev_day.get(field, 0))
+            if value > 0 and _crossed(prev_mid, mid, value, up):
+                events.append({
+                    "event": "broke_above" if up else "broke_below",
+                    "level": level, "price": price, "level_value": value
+                })
 
-
-def load_todays_signals(max_signals: int = 50) -> list[dict]:
-    """Load today's signals for LLM context."""
-    if not SIGNALS_PATH.exists():
-        return []
+    # Intraday high/low breaks from 15m candles (excluding the open bar)
+    day_high, day_low = _intraday_range(data.get("candles_15m", [])[:-1])
+    if day_high is not None and _crossed(prev_mid, mid, day_high, True):
+        events.append({"event": "new_day_high", "price": price, "level_value": round(day_high, 2)})
+    if day_low is not None and _crossed(prev_mid, mid, day_low, False):
+        events.append({"event": "new_day_low", "price": price, "level_value": round(day_low, 2)})
+
+    # Large moves (> 1% between ticks)
+    pct_change = (mid - prev_mid) / prev_mid * 100
+    if abs(pct_change) > 1.0:
+        events.append({
+            "event": "large_move_up" if pct_change > 0 else "large_move_down",
+            "pct": round(pct_change, 3), "price": price
+        })
+
+    return events
+
+
+def _crossed(prev_mid: float, mid: float, level: float, up: bool) -> bool:
+    """True if price moved through `level` in the given direction since the last tick."""
+    if up:
+        return prev_mid <= level < mid
+    return prev_mid >= level > mid
+
+
+def _intraday_range(candles: list[dict]) -> tuple[float | None, float | None]:
+    """(highest high, lowest positive low) over the candles, in one pass."""
+    day_high = day_low = None
+    for c in candles:
+        if c.get("h"):
+            h = float(c["h"])
+            if day_high is None or h > day_high:
+                day_high = h
+        if c.get("l"):
+            l = float(c["l"])
+            if l > 0 and (day_low is None or l < day_low):
+                day_low = l
+    return day_high, day_low
+
+
+def load_todays_signals(conn: sqlite3.Connection, max_signals: int = 50) -> list[dict]:
+    """Load today's signals for LLM context (most recent N, oldest first).
+
+    Rows from earlier days are excluded even if the collector has not reset
+    them yet; the ts_ms index makes this a range scan.
+    """
     try:
-        with open(SIGNALS_PATH, "r") as f:
-            lines = f.readlines()
-        signals = []
-        for line in lines:
-            line = line.strip()
-            if line:
-                signals.append(json.loads(line))
-        # Return most recent N
-        return signals[-max_signals:]
-    except Exception as e:
+        rows = conn.execute(
+            "SELECT data FROM signals WHERE ts_ms >= ? ORDER BY ts_ms DESC, id DESC LIMIT ?",
+            (_day_start_ms(), max_signals),
+        ).fetchall()
+    except sqlite3.Error as e:
         log.warning(f"Could not load signals: {e}")
         return []
+    return [orjson.loads(data) for (data,) in reversed(rows)]
+
+
+def reset_signals(conn: sqlite3.Connection) -> None:
+    """Call at start of new trading day to drop signals from previous days."""
+    conn.execute("DELETE FROM signals WHERE ts_ms < ?", (_day_start_ms(),))
+    conn.commit()
 
 
-def reset_signals() -> None:
-    """Call at start of new trading day to clear signal log."""
-    if SIGNALS_PATH.exists():
-        SIGNALS_PATH.unlink()
\ No newline at end of file
+def _day_start_ms() -> int:
+    """Epoch ms of the current UTC midnight."""
+    day_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return int(day_start.timestamp() * 1000)
@@ -3,11 +3,13 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Iterator, Sequence
 
-from anthropic import Anthropic
+from anthropic import Anthropic, DefaultHttpxClient
 
 from src.config import ANTHROPIC_API_KEY, LLM_MODEL, LLM_TEMPERATURE, LLM_MAX_TOKENS
-from src.llm.base import BaseLLMClient
+from src.llm.base import BaseLLMClient, PromptChunk
+from src.llm.schema import SCHEMA_NAME, trade_plan_schema
 
 log = logging.getLogger(__name__)
 
@@ -16,30 +18,63 @@ class AnthropicClient(BaseLLMClient):
     def __init__(self) -> None:
         if not ANTHROPIC_API_KEY:
             raise ValueError("ANTHROPIC_API_KEY not set in .env")
-        self._client = Anthropic(api_key=ANTHROPIC_API_KEY)
+        # Keep one HTTP/2 connection alive across calls (the SDK's defaults, plus h2)
+        self._client = Anthropic(api_key=ANTHROPIC_API_KEY, http_client=DefaultHttpxClient(http2=True))
         self._model = LLM_MODEL
 
-    def analyze(self, market_state_json: str, system_prompt: str) -> str:
+    def analyze_stream(
+        self, market_state_json: str, system_chunks: Sequence[PromptChunk]
+    ) -> Iterator[str]:
         log.info(f"Calling Anthropic ({self._model})...")
-        resp = self._client.messages.create(
+        with self._client.messages.stream(
             model=self._model,
             temperature=LLM_TEMPERATURE,
             max_tokens=LLM_MAX_TOKENS,
-            system=system_prompt,
+            system=_system_blocks(system_chunks),
             messages=[
                 {
                     "role": "user",
                     "content": (
-                        "Here is the current Market State. Analyze and return "
-                        "your trade plan as STRICT JSON matching the required schema. "
-                        "Return ONLY the JSON object, no markdown fences, no explanation.\n\n"
+                        "Analyze the context below and return your trade plan.\n\n"
                         f"{market_state_json}"
                     ),
                 },
             ],
-        )
-        content = resp.content[0].text
+            # Forced tool call: the tool input is the trade plan, constrained to the schema
+            tools=[{
+                "name": SCHEMA_NAME,
+                "description": "Submit the trade plan.",
+                "input_schema": trade_plan_schema(),
+            }],
+            tool_choice={"type": "tool", "name": SCHEMA_NAME},
+        ) as stream:
+            for event in stream:
+                if event.type == "content_block_delta" and event.delta.type == "input_json_delta":
+                    yield event.delta.partial_json
+            usage = stream.get_final_message().usage
+        self.last_usage = {
+            "input_tokens": usage.input_tokens,
+            "output_tokens": usage.output_tokens,
+            "cache_creation_input_tokens": usage.cache_creation_input_tokens or 0,
+            "cache_read_input_tokens": usage.cache_read_input_tokens or 0,
+        }
         log.info(
-            f"LLM response: {resp.usage.input_tokens}in/{resp.usage.output_tokens}out tokens"
+            f"LLM response: {usage.input_tokens}in/{usage.output_tokens}out tokens "
+            f"(cache: {self.last_usage['cache_read_input_tokens']} read, "
+            f"{self.last_usage['cache_creation_input_tokens']} written)"
         )
-        return content
\ No newline at end of file
+
+
+def _system_blocks(chunks: Sequence[PromptChunk]) -> list[dict]:
+    """System prompt as text blocks, with a cache breakpoint after each cacheable chunk.
+
+    The forced tool definition precedes the system prompt, so it is part of
+    every cached prefix.
+    """
+    blocks = []
+    for chunk in chunks:
+        block = {"type": "text", "text": chunk.text}
+        if chunk.cache:
+            block["cache_control"] = {"type": "ephemeral"}
+        blocks.append(block)
+    return blocks
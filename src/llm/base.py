@@ -3,10 +3,39 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from collections.abc import Iterator, Sequence
+from typing import NamedTuple
+
+
+class PromptChunk(NamedTuple):
+    """One piece of the system prompt.
+
+    `cache` marks text that is identical across calls, so providers with
+    explicit cache breakpoints can cache the prefix ending at this chunk.
+    """
+
+    text: str
+    cache: bool = False
+
+
+def join_chunks(chunks: Sequence[PromptChunk]) -> str:
+    """The chunks as one string, for providers that take a plain system message."""
+    return "\n\n".join(c.text for c in chunks)
 
 
 class BaseLLMClient(ABC):
+    # Token usage of the most recent call (provider-reported), None if unknown
+    last_usage: dict | None = None
+    # True if the most recent response was replayed from cache, not generated
+    last_cache_hit: bool = False
+
     @abstractmethod
-    def analyze(self, market_state_json: str, system_prompt: str) -> str:
-        """Send market state to LLM, return raw JSON string response."""
+    def analyze_stream(
+        self, market_state_json: str, system_chunks: Sequence[PromptChunk]
+    ) -> Iterator[str]:
+        """Send market state to LLM, yield the raw JSON response as text deltas."""
         ...
+
+    def analyze(self, market_state_json: str, system_chunks: Sequence[PromptChunk]) -> str:
+        """Send market state to LLM, return raw JSON string response."""
+        return "".join(self.analyze_stream(market_state_json, system_chunks))
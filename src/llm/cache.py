@@ -0,0 +1,78 @@
+"""Exact-match response cache in front of an LLM client."""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import time
+from collections.abc import Iterator, Sequence
+
+from src.collectors.storage import get_conn
+from src.config import LLM_CACHE_TTL_SECONDS, LLM_MODEL, LLM_PROVIDER
+from src.llm.base import BaseLLMClient, PromptChunk, join_chunks
+
+log = logging.getLogger(__name__)
+
+_DDL = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    response TEXT NOT NULL
+);
+"""
+
+
+class CachingLLMClient(BaseLLMClient):
+    """Returns the stored response when the same prompt was answered within the TTL.
+
+    Keyed on provider, model, system prompt and market state, so only a
+    byte-identical request is served from cache.
+    """
+
+    def __init__(self, inner: BaseLLMClient, ttl_seconds: int = LLM_CACHE_TTL_SECONDS) -> None:
+        self._inner = inner
+        self._ttl = ttl_seconds
+        self._conn = get_conn()
+        self._conn.executescript(_DDL)
+        self._hits = 0
+        self._misses = 0
+
+    def analyze_stream(
+        self, market_state_json: str, system_chunks: Sequence[PromptChunk]
+    ) -> Iterator[str]:
+        key = _cache_key(market_state_json, join_chunks(system_chunks))
+        now = time.time()
+        row = self._conn.execute(
+            "SELECT response FROM llm_cache WHERE key = ? AND created_at >= ?",
+            (key, now - self._ttl),
+        ).fetchone()
+        if row:
+            self.last_usage = None
+            self.last_cache_hit = True
+            self._hits += 1
+            log.info(f"LLM cache hit ({self._hits}/{self._hits + self._misses} this run)")
+            yield row[0]
+            return
+
+        self.last_cache_hit = False
+        self._misses += 1
+        parts = []
+        for delta in self._inner.analyze_stream(market_state_json, system_chunks):
+            parts.append(delta)
+            yield delta
+        self.last_usage = self._inner.last_usage
+        # Only a fully received response is stored
+        self._conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, created_at, response) VALUES (?, ?, ?)",
+            (key, now, "".join(parts)),
+        )
+        self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self._ttl,))
+        self._conn.commit()
+
+
+def _cache_key(market_state_json: str, system_prompt: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for part in (LLM_PROVIDER, LLM_MODEL, system_prompt, market_state_json):
+        h.update(part.encode())
+        h.update(b"\0")
+    return h.hexdigest()
@@ -2,11 +2,24 @@
 
 from __future__ import annotations
 
-from src.config import LLM_PROVIDER
+from src.config import LLM_CACHE_TTL_SECONDS, LLM_PROVIDER
 from src.llm.base import BaseLLMClient
 
+# Process-wide client, so its connection pool (and TLS session) is reused
+_client: BaseLLMClient | None = None
+
 
 def get_llm_client() -> BaseLLMClient:
+    global _client
+    if _client is None:
+        _client = _create_client()
+        if LLM_CACHE_TTL_SECONDS > 0:
+            from src.llm.cache import CachingLLMClient
+            _client = CachingLLMClient(_client)
+    return _client
+
+
+def _create_client() -> BaseLLMClient:
     if LLM_PROVIDER == "openai":
         from src.llm.openai_client import OpenAIClient
         return OpenAIClient()
@@ -3,11 +3,13 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Iterator, Sequence
 
-from openai import OpenAI
+from openai import OpenAI, DefaultHttpxClient
 
 from src.config import OPENAI_API_KEY, LLM_MODEL, LLM_TEMPERATURE, LLM_MAX_TOKENS
-from src.llm.base import BaseLLMClient
+from src.llm.base import BaseLLMClient, PromptChunk, join_chunks
+from src.llm.schema import SCHEMA_NAME, trade_plan_schema
 
 log = logging.getLogger(__name__)
 
@@ -16,30 +18,50 @@ class OpenAIClient(BaseLLMClient):
     def __init__(self) -> None:
         if not OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY not set in .env")
-        self._client = OpenAI(api_key=OPENAI_API_KEY)
+        # Keep one HTTP/2 connection alive across calls (the SDK's defaults, plus h2)
+        self._client = OpenAI(api_key=OPENAI_API_KEY, http_client=DefaultHttpxClient(http2=True))
         self._model = LLM_MODEL
 
-    def analyze(self, market_state_json: str, system_prompt: str) -> str:
+    def analyze_stream(
+        self, market_state_json: str, system_chunks: Sequence[PromptChunk]
+    ) -> Iterator[str]:
         log.info(f"Calling OpenAI ({self._model})...")
-        resp = self._client.chat.completions.create(
+        stream = self._client.chat.completions.create(
             model=self._model,
             temperature=LLM_TEMPERATURE,
             max_tokens=LLM_MAX_TOKENS,
-            response_format={"type": "json_object"},
+            response_format={
+                "type": "json_schema",
+                "json_schema": {"name": SCHEMA_NAME, "strict": True, "schema": trade_plan_schema()},
+            },
             messages=[
-                {"role": "system", "content": system_prompt},
+                # OpenAI caches prompt prefixes automatically; no markers needed
+                {"role": "system", "content": join_chunks(system_chunks)},
                 {
                     "role": "user",
                     "content": (
-                        "Here is the current Market State. Analyze and return "
-                        "your trade plan as STRICT JSON matching the required schema.\n\n"
+                        "Analyze the context below and return your trade plan.\n\n"
                         f"{market_state_json}"
                     ),
                 },
             ],
+            stream=True,
+            stream_options={"include_usage": True},
         )
-        content = resp.choices[0].message.content or ""
-        log.info(
-            f"LLM response: {resp.usage.prompt_tokens}p/{resp.usage.total_tokens}t tokens"
-        )
-        return content
+        for chunk in stream:
+            if chunk.choices:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+            if chunk.usage:
+                details = chunk.usage.prompt_tokens_details
+                cached = (details.cached_tokens or 0) if details else 0
+                self.last_usage = {
+                    "input_tokens": chunk.usage.prompt_tokens,
+                    "output_tokens": chunk.usage.completion_tokens,
+                    "cache_read_input_tokens": cached,
+                }
+                log.info(
+                    f"LLM response: {chunk.usage.prompt_tokens}p/{chunk.usage.total_tokens}t tokens "
+                    f"({cached} cached)"
+                )
@@ -0,0 +1,20 @@
+"""Compact the Market State before it is sent to the LLM (fewer input tokens)."""
+
+from __future__ import annotations
+
+from typing import Any
+
+# Significant figures kept for floats. Six keeps BTC prices to the dollar and
+# small funding rates intact; four would round 100123.5 to 1.001e+05.
+SIG_FIGS = 6
+
+
+def compact(obj: Any) -> Any:
+    """Drop None-valued keys and round floats to SIG_FIGS significant figures."""
+    if isinstance(obj, dict):
+        return {k: compact(v) for k, v in obj.items() if v is not None}
+    if isinstance(obj, list):
+        return [compact(v) for v in obj]
+    if isinstance(obj, float):
+        return float(f"{obj:.{SIG_FIGS}g}")
+    return obj
@@ -1,173 +1,98 @@
-SYSTEM_PROMPT = """You are an elite short-term derivatives trader analyzing Hyperliquid perpetual markets.
-
-You receive a structured Market State and must return STRICT JSON only — no markdown, no commentary, no extra text.
-
-CONTEXT: The user sets trades in the morning and checks them after work (2-12 hour horizon).
-Setups must be CONDITIONAL BRACKET ORDERS that can be placed and left alone.
-Prefer setups that:
-- Trigger on a level test/break (not "enter now at market")
-- Have clean invalidation (hard stop, no babysitting required)
-- Target realistic moves based on ATR data (don't target 3x daily ATR)
-- Work as passive limit orders or stop-limit triggers
-
-YOUR ONLY JOB:
-1. Classify the market regime.
-2. Select from the allowed playbooks.
-3. Parameterize conditional bracket orders WITH CORRECT MATH.
-4. Score confidence using OBJECTIVE criteria.
-
-PLAYBOOKS (you may ONLY use these):
-A) Breakdown Acceptance Short: price closes below key level + failed retest
-B) Breakout Acceptance Long: price closes above key level + held retest
-C) Failed Breakdown Reclaim Long: sweep below key level + reclaim/accept above
-D) Mean Reversion to VWAP/Value: ONLY if regime=range/chop AND volatility supports it
-E) NO_TRADE: MUST use if edge is poor, liquidity bad, or signals conflict
-
-KEY LEVELS TO USE (from the Market State data):
-- day_high, day_low (intraday range)
-- prior_day_high, prior_day_low, prior_day_close
-- pivot_pp, pivot_r1, pivot_s1, pivot_r2, pivot_s2 (floor pivots)
-- vwap (volume-weighted average price)
-- week_high, week_low (multi-day context)
-Entry triggers and stops MUST reference these actual levels. Do NOT invent levels.
-
-TARGET SIZING GUIDE (use ATR data to sanity-check targets):
-- TP1 should be achievable within 2-6 hours: roughly 0.5-1.0x the 4h ATR
-- TP2 should be achievable within 6-12 hours: roughly 1.0-1.5x the 4h ATR
-- TP3 is a stretch target: up to 2x the 4h ATR
-- Stop distance should be no more than 0.5-1.0x the 1h ATR from entry
-If targets would require a move larger than the 4h ATR, reduce them or use NO_TRADE.
-
-POSITION SIZING — YOU MUST COMPUTE THIS CORRECTLY:
-Given: equity, max_loss_per_trade_usd, entry_price, stop_price
-1. stop_distance_pct = abs(entry_price - stop_price) / entry_price
-2. position_notional_usd = max_loss_per_trade_usd / stop_distance_pct
-3. recommended_leverage = position_notional_usd / margin_budget
-   Leverage MUST be 1-6x unless stop is very tight AND liquidation buffer >= 15%.
-4. margin_used_usd = position_notional_usd / recommended_leverage
-5. Verify: position_notional_usd * stop_distance_pct ≈ max_loss_usd
-
-Example: equity=$10000, max_loss=$100, entry=66750, stop=66500
-- stop_dist = 250/66750 = 0.00375 (0.375%)
-- notional = 100/0.00375 = $26,667
-- leverage = 26667/5000 = ~5.3x → use 5x
-- margin = 26667/5 = $5,333
-- verify: 26667 * 0.00375 = $100 ✓
-
-RISK RULES (non-negotiable):
-- Max loss per trade <= risk_context.max_loss_per_trade_usd (HARD ceiling)
-- Total risk across all setups <= risk_context.max_total_risk_usd
-- Leverage: 1-6x default. >6x ONLY if stop very tight AND liq buffer >= 15%
-- Every setup MUST have: entry trigger, hard stop, TP ladder, time-cancel, time-stop
-- If data is insufficient, default to playbook E (NO_TRADE)
-
-CONFIDENCE SCORING (0-100, weighted sum of exactly 10 criteria):
-Be STRICT and HONEST. A total confidence above 60 should be uncommon. Above 70 is rare.
-After scoring each criterion, compute the WEIGHTED SUM and put that exact number as "confidence".
-The "confidence" field will be auto-computed server-side from your raw scores.
-You may set it to 0 or any placeholder — it will be overwritten.
-
-Weights reflect importance for 2-12h conditional bracket orders:
-
-1. Level quality (0-10, WEIGHT 2.0) — Is the trigger level structurally significant?
-   Confluent levels (pivot + prior day + round number) score 8-10.
-   Single reference level scores 5-7. Invented/arbitrary level scores 0-3.
-2. Risk/reward quality (0-10, WEIGHT 1.5) — R:R >= 3.0 scores 9-10. >= 2.0 scores 6-8.
-   >= 1.5 scores 4-5. Below 1.5 scores 0-3.
-3. Regime alignment (0-10, WEIGHT 1.5) — Does the regime match the playbook?
-   Trend + breakout/breakdown = high. Range + mean reversion = high.
-   Range + breakout = low. Chop + anything = low.
-4. Multi-TF alignment (0-10, WEIGHT 1.5) — Are 15m/1h/4h returns in the same direction
-   as the trade? All aligned = 8-10. Mixed = 4-6. Conflicting = 0-3.
-5. Volatility suitability (0-10, WEIGHT 1.0) — Are TPs achievable per ATR?
-   Is stop distance reasonable (0.3-1.0x 1h ATR)? TP1 within 1x 4h ATR?
-6. Funding/OI alignment (0-10, WEIGHT 0.5) — Funding trend not extreme against trade.
-   OI delta supportive (rising OI + breakout = good). Neutral = 5.
-7. Orderbook health (0-10, WEIGHT 0.5) — PASS/FAIL only: spread < 5bps and
-   depth adequate = 5. Otherwise 0. Don't over-score this.
-8. Orderbook signal (0-10, WEIGHT 0.25) — Imbalance supports direction.
-   Low weight because this changes every second. >+0.3 for long = 7.
-   Neutral = 5. Don't let this swing confidence significantly.
-9. Flow confirmation (0-10, WEIGHT 0.25) — Aggressive buy/sell ratio supports.
-   Same caveat: point-in-time data, low predictive value for multi-hour holds.
-10. No landmines (0-10, WEIGHT 1.0) — Data fresh, no extreme vol spike,
-    no extreme funding, no obvious news risk. Clean = 8-10.
-
-OUTPUT SCHEMA — return EXACTLY this structure:
-{
-  "timestamp": "ISO timestamp from the Market State",
-  "regime": "trend|range|high_vol|low_vol|chop",
-  "regime_note": "1-2 short sentences",
-  "setups": [
-    {
-      "rank": 1,
-      "asset": "BTC|ETH|...",
-      "direction": "long|short|no_trade",
-      "playbook": "A|B|C|D|E",
-      "confidence": 0-100,
-      "confidence_breakdown": [
-        {"criterion": "name", "score": 0-10}
-        ... exactly 10 items, scores MUST sum EXACTLY to confidence
-      ],
-      "time_horizon_hours": [2, 12],
-      "entry": {
-        "type": "trigger",
-        "trigger_conditions": ["condition1", "condition2"],
-        "entry_style": "limit_on_retest|stop_market_on_break|limit",
-        "levels": {"trigger": 0.0, "retest_zone_low": 0.0, "retest_zone_high": 0.0}
-      },
-      "stop": {"level": 0.0, "why": "reason referencing a specific level from key_levels"},
-      "take_profits": [
-        {"level": 0.0, "pct": 50},
-        {"level": 0.0, "pct": 30},
-        {"level": 0.0, "pct": 20}
-      ],
-      "risk": {
-        "risk_pct_equity": 0.0,
-        "max_loss_usd": 0.0,
-        "recommended_leverage": 1,
-        "position_notional_usd": 0.0,
-        "margin_used_usd": 0.0,
-        "rr_to_tp1": 0.0,
-        "cancel_if_not_triggered_minutes": 0,
-        "time_stop_minutes": 0,
-        "liquidation_buffer_note": "short and conservative"
-      },
-      "invalidations": ["specific condition from data"],
-      "red_flags": ["specific condition to exit immediately"],
-      "if_not_triggered": "what to do if setup never triggers"
-    }
-    ... exactly 3 setups total
-  ],
-  "no_trade_reason": ""
-}
-
-RULES:
-- Always return exactly 3 setups.
-- If fewer than 3 valid opportunities, fill remaining with playbook E, direction "no_trade".
-- If ALL are no_trade, explain in "no_trade_reason". This is FINE — no trade is a valid output.
-- confidence MUST equal the EXACT sum of the 10 breakdown scores. Add them up carefully.
-- risk_pct_equity must not exceed the per-trade limit.
-- Sum of all setups' risk_pct_equity must not exceed total risk limit.
-- Do not hallucinate levels — use ONLY levels from the Market State key_levels.
-- Double-check your position sizing arithmetic before returning.
-- Return ONLY the JSON object. No markdown fences. No explanation text.
-
-CONSISTENCY RULES:
-- If a PREVIOUS ANALYSIS SUMMARY is provided, use it as CONTEXT, not a TEMPLATE:
-  - If market conditions have NOT materially changed (price moved < 0.5%, regime same),
-    you should generally MAINTAIN the same setups unless a specific invalidation was hit.
-  - If you change direction on an asset, you MUST score "Regime alignment" lower (max 5)
-    to reflect the ambiguity that caused the flip.
-  - "Material change" means: price crossed a key level, regime changed, or an invalidation
-    from the previous setup was triggered.
-  - In a range/chop regime, prefer NO_TRADE (playbook E) over low-conviction directional bets.
-    A range with no level test in progress should default to NO_TRADE.
-- If NO previous analysis is provided, analyze fresh.
-- If INTRADAY SIGNALS are provided, use them to understand what has already happened today:
-  - "broke_above prior_day_high" means that level was already tested and cleared — don't
-    suggest a breakout setup for a level that already broke hours ago.
-  - "new_day_low" means sellers were active — consider whether the low held or is being
-    retested.
-  - Multiple signals at the same level = that level is being actively contested (high value).
-  - No signals for an asset = it hasn't tested any key levels today (likely range-bound)."""
\ No newline at end of file
+"""System prompt for the trade-plan LLM, composed from fragments in prompts/*.txt.
+
+The prompt (role, playbooks, sizing, scoring, regime/signal rules, output
+rules, then the consistency rules about the previous analysis) never changes
+between calls, so providers can cache all of it.
+
+The per-call data itself goes in the user message, under the section headers
+defined here so the prompt and the message builder agree on their names.
+The output structure itself is enforced by the provider (see schema.py).
+"""
+
+from __future__ import annotations
+
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+
+from src.config import VERIFY_PROMPT_CACHEABILITY
+from src.llm.base import PromptChunk
+
+_PROMPT_DIR = Path(__file__).parent / "prompts"
+
+# Static fragments, in prompt order. Keep these byte-stable: any edit
+# invalidates provider-side prompt caches.
+_STATIC_FRAGMENTS = ("role", "playbooks", "sizing", "scoring", "context", "output")
+
+# Smallest prompt OpenAI and Anthropic (Sonnet/Opus) will cache; below it every call is full price
+_CACHE_MIN_TOKENS = 1024
+
+# User-message section headers for the per-call context, in message order
+PREVIOUS_ANALYSIS_HEADER = (
+    "PREVIOUS ANALYSIS SUMMARY (do NOT copy — re-evaluate using current data):"
+)
+INTRADAY_SIGNALS_HEADER = "INTRADAY SIGNALS (objective events detected today):"
+MARKET_STATE_HEADER = "CURRENT MARKET STATE:"
+
+
+@lru_cache(maxsize=16)
+def load_prompt(name: str) -> str:
+    """Read prompts/<name>.txt (without its trailing newline)."""
+    return (_PROMPT_DIR / f"{name}.txt").read_text(encoding="utf-8").removesuffix("\n")
+
+
+@lru_cache(maxsize=8)
+def make_prompt(*, consistency: bool = True) -> str:
+    """Assemble a system prompt variant; the static prefix is identical in all of them."""
+    fragments = [load_prompt(name) for name in _STATIC_FRAGMENTS]
+    if consistency:
+        fragments.append(load_prompt("consistency"))
+    return "\n\n".join(fragments)
+
+
+# Full prompt as one string (hashing, token counts)
+SYSTEM_PROMPT = make_prompt()
+# UTF-8 encoding of SYSTEM_PROMPT, encoded once for hashing
+SYSTEM_PROMPT_BYTES: bytes = SYSTEM_PROMPT.encode("utf-8")
+
+# The system prompt as chunks, as passed to the LLM clients. It is fixed for the
+# life of the process, so one cache breakpoint at its end covers all of it.
+SYSTEM_PROMPT_CHUNKS: tuple[PromptChunk, ...] = (PromptChunk(SYSTEM_PROMPT, cache=True),)
+
+
+@lru_cache(maxsize=1)
+def system_prompt_sha256() -> str:
+    """Content hash of SYSTEM_PROMPT — identifies the prompt version in logs and cache keys."""
+    return hashlib.sha256(SYSTEM_PROMPT_BYTES).hexdigest()
+
+
+SYSTEM_PROMPT_SHA256 = system_prompt_sha256()
+
+
+@lru_cache(maxsize=4)
+def system_prompt_token_count(model: str = "gpt-4o") -> int:
+    """Token count of SYSTEM_PROMPT, computed once per model.
+
+    Uses tiktoken if installed (optional); otherwise estimates ~4 chars/token.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return len(SYSTEM_PROMPT) // 4
+    try:
+        enc = tiktoken.encoding_for_model(model)
+    except KeyError:
+        enc = tiktoken.get_encoding("o200k_base")
+    return len(enc.encode(SYSTEM_PROMPT))
+
+
+def _verify_cacheable() -> None:
+    n = system_prompt_token_count()
+    if n < _CACHE_MIN_TOKENS:
+        raise RuntimeError(
+            f"System prompt is {n} tokens — below the {_CACHE_MIN_TOKENS}-token prompt-cache minimum"
+        )
+
+
+if VERIFY_PROMPT_CACHEABILITY:
+    _verify_cacheable()
@@ -0,0 +1,63 @@
+"""JSON schema for the trade plan, passed to the providers' structured-output modes.
+
+Derived from the LLMOutput pydantic models, with $refs inlined, every object
+closed (additionalProperties: false) and every property required — the
+subset both OpenAI strict json_schema and Anthropic tool input accept.
+Enum and description hints that the validators enforce are added here so the
+decoder is constrained to them too.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+
+from src.models.llm_output import LLMOutput
+
+SCHEMA_NAME = "trade_plan"
+
+# Extra constraints per (model name, property name), merged into the generated schema
+_FIELD_HINTS: dict[tuple[str, str], dict] = {
+    ("LLMOutput", "timestamp"): {"description": "ISO timestamp from the Market State"},
+    ("LLMOutput", "regime"): {"enum": ["trend", "range", "high_vol", "low_vol", "chop"]},
+    ("LLMOutput", "regime_note"): {"description": "1-2 short sentences"},
+    ("LLMOutput", "setups"): {"description": "Exactly 3 setups, ranked 1-3"},
+    ("Setup", "direction"): {"enum": ["long", "short", "no_trade"]},
+    ("Setup", "playbook"): {"enum": ["A", "B", "C", "D", "E"]},
+    ("Setup", "confidence"): {"description": "Always 0; computed server-side"},
+    ("Setup", "confidence_breakdown"): {"description": "All 10 criteria, in scoring order"},
+    ("Setup", "time_horizon_hours"): {"description": "[min, max] hours, e.g. [2, 12]"},
+    ("Setup", "invalidations"): {"description": "Specific conditions from the data"},
+    ("Setup", "red_flags"): {"description": "Specific conditions to exit immediately"},
+    ("Setup", "if_not_triggered"): {"description": "What to do if the setup never triggers"},
+    ("ConfidenceCriterion", "score"): {"description": "0-10"},
+    ("Entry", "type"): {"enum": ["trigger"]},
+    ("Entry", "entry_style"): {"enum": ["limit_on_retest", "stop_market_on_break", "limit"]},
+    ("Stop", "why"): {"description": "Reason referencing a specific level from key_levels"},
+    ("TakeProfit", "pct"): {"description": "Share of the position closed here, e.g. 50/30/20"},
+    ("Risk", "liquidation_buffer_note"): {"description": "Short and conservative"},
+}
+
+
+def _close(node: dict, defs: dict) -> dict:
+    """Inline $refs, close objects and apply _FIELD_HINTS, recursively."""
+    if "$ref" in node:
+        return _close(defs[node["$ref"].rsplit("/", 1)[-1]], defs)
+    out = {k: v for k, v in node.items() if k not in ("$defs", "title")}
+    if "items" in out:
+        out["items"] = _close(out["items"], defs)
+    if out.get("type") == "object":
+        name = node.get("title", "")
+        out["properties"] = {
+            key: {**_close(prop, defs), **_FIELD_HINTS.get((name, key), {})}
+            for key, prop in out["properties"].items()
+        }
+        out["required"] = list(out["properties"])
+        out["additionalProperties"] = False
+    return out
+
+
+@lru_cache(maxsize=1)
+def trade_plan_schema() -> dict:
+    """Strict JSON schema for LLMOutput (built once)."""
+    schema = LLMOutput.model_json_schema()
+    return _close(schema, schema.get("$defs", {}))
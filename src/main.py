@@ -11,22 +11,36 @@ Commands:
 from __future__ import annotations
 
 import argparse
-import json
 import logging
 import signal
-import sys
 import time
 from datetime import datetime, timezone
 
 import httpx
+import orjson
 
 from src import config
-from src.collectors.hyperliquid import collect_snapshot
-from src.collectors.storage import get_conn, store_snapshot, get_latest_snapshots, get_snapshot_count
+from src.collectors.hyperliquid import collect_snapshot, new_client
+from src.collectors.storage import (
+    SnapshotWriter,
+    get_conn,
+    get_latest_llm_output,
+    get_latest_snapshots,
+    get_snapshot_count,
+    store_llm_output,
+)
 from src.display import print_market_state, print_setups, print_market_state_json
 from src.features.engine import build_market_state
+from src.features.signals import load_todays_signals, reset_signals, track_signals
 from src.llm.factory import get_llm_client
-from src.llm.prompt import SYSTEM_PROMPT
+from src.llm.payload import compact
+from src.llm.prompt import (
+    INTRADAY_SIGNALS_HEADER,
+    MARKET_STATE_HEADER,
+    PREVIOUS_ANALYSIS_HEADER,
+    SYSTEM_PROMPT_CHUNKS,
+    SYSTEM_PROMPT_SHA256,
+)
 from src.validation.validator import validate_llm_output
 
 logging.basicConfig(
@@ -39,39 +53,29 @@ log = logging.getLogger("main")
 
 _running = True
 
-# Track the current day for signal reset
-_current_day: str | None = None
+# Track the current UTC day (days since epoch) for signal reset
+_current_day: int | None = None
 
 
-def _load_previous_analysis() -> dict | None:
+def _load_previous_analysis(conn) -> dict | None:
     """Load the most recent LLM output for anchoring."""
-    log_path = config.DB_PATH.parent.parent / "logs" / "llm_outputs.jsonl"
-    if not log_path.exists():
-        return None
     try:
-        with open(log_path, "r") as f:
-            lines = f.readlines()
-        if not lines:
-            return None
-        for line in reversed(lines):
-            line = line.strip()
-            if line:
-                return json.loads(line)
+        return get_latest_llm_output(conn)
     except Exception as e:
         log.warning(f"Could not load previous analysis: {e}")
     return None
 
 
-def _check_daily_reset() -> None:
+def _check_daily_reset(conn) -> None:
     """Reset signal log at the start of each new UTC day."""
     global _current_day
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    today = int(time.time() // 86400)
     if _current_day is None:
         _current_day = today
     elif today != _current_day:
-        from src.features.signals import reset_signals
-        reset_signals()
-        log.info(f"New day {today} — reset intraday signals")
+        reset_signals(conn)
+        day_str = datetime.fromtimestamp(today * 86400, timezone.utc).strftime("%Y-%m-%d")
+        log.info(f"New day {day_str} — reset intraday signals")
         _current_day = today
 
 
@@ -86,27 +90,35 @@ def cmd_collect(args: argparse.Namespace) -> None:
     signal.signal(signal.SIGINT, _handle_sigint)
 
     conn = get_conn()
-    client = httpx.Client()
+    client = new_client()
+    writer = SnapshotWriter()
     interval = config.POLL_INTERVAL_SECONDS
 
+    # Stores happen on the writer thread, so the count and the previous
+    # snapshot are tracked here rather than read back from the DB.
+    count = get_snapshot_count(conn)
+    latest = get_latest_snapshots(conn, n=1)
+    prev_snap = latest[0] if latest else None
+
     log.info(f"Collecting {config.ASSETS} every {interval}s. Ctrl+C to stop.")
 
     while _running:
+        # Monotonic, so wall-clock adjustments don't skew the poll interval
+        t0 = time.monotonic()
         try:
             # Check for daily signal reset
-            _check_daily_reset()
+            if config.ENABLE_SIGNALS:
+                _check_daily_reset(conn)
 
-            t0 = time.time()
             snapshot = collect_snapshot(client)
-            store_snapshot(conn, snapshot)
-            count = get_snapshot_count(conn)
+            writer.put(snapshot)
+            count += 1
 
             # Track intraday signals
-            from src.features.signals import track_signals
-            prev_snaps = get_latest_snapshots(conn, n=2)
-            prev_snap = prev_snaps[1] if len(prev_snaps) >= 2 else None
-            track_signals(snapshot, prev_snap)
-            elapsed = time.time() - t0
+            if config.ENABLE_SIGNALS:
+                track_signals(conn, snapshot, prev_snap)
+            prev_snap = snapshot
+            elapsed = time.monotonic() - t0
 
             prices = "  ".join(
                 f"{sym}={snapshot['assets'].get(sym, {}).get('mid', '?')}"
@@ -119,12 +131,12 @@ def cmd_collect(args: argparse.Namespace) -> None:
         except Exception as e:
             log.error(f"Collection error: {e}", exc_info=True)
 
-        elapsed = time.time() - t0
-        sleep_time = max(0, interval - elapsed)
+        sleep_time = max(0, interval - (time.monotonic() - t0))
         if _running and sleep_time > 0:
             time.sleep(sleep_time)
 
     client.close()
+    writer.close()
     conn.close()
     log.info("Collector stopped.")
 
@@ -143,7 +155,7 @@ def cmd_analyze(args: argparse.Namespace) -> None:
     log.info(f"Loaded {len(snapshots)} snapshots (total in DB: {count})")
 
     # Cooldown check
-    prev = _load_previous_analysis()
+    prev = _load_previous_analysis(conn)
     if prev and prev.get("timestamp"):
         try:
             prev_dt = datetime.fromisoformat(prev["timestamp"])
@@ -181,38 +193,38 @@ def cmd_analyze(args: argparse.Namespace) -> None:
         conn.close()
         return
 
-    state_json = json.dumps(market_state.model_dump(), default=str)
-
-    # Load previous analysis for anchoring
-    prev_analysis = _load_previous_analysis()
+    state_json = orjson.dumps(compact(market_state.model_dump()), default=str).decode()
 
     # Load intraday signals
-    from src.features.signals import load_todays_signals
-    signals = load_todays_signals(max_signals=30)
+    signals: list[dict] = []
+    if config.ENABLE_SIGNALS:
+        signals = load_todays_signals(conn, max_signals=30)
 
-    anchored_state = state_json
-
-    if signals:
-        signals_text = json.dumps(signals, default=str)
-        anchored_state += (
-            f"\n\nINTRADAY SIGNALS (objective events detected today):\n"
-            f"{signals_text}"
-        )
+    # Slow-changing context first and the per-call market state last, so
+    # successive requests share the longest possible prefix.
+    sections = []
 
     # Build concise anchoring summary (replaces raw JSON dump)
-    from src.anchoring import build_anchoring_context
-    anchor_summary = build_anchoring_context(prev_analysis, signals)
+    anchor_summary = None
+    if config.ENABLE_ANCHORING:
+        from src.anchoring import build_anchoring_context
+        anchor_summary = build_anchoring_context(prev, signals)
 
     if anchor_summary:
-        anchored_state += (
-            f"\n\nPREVIOUS ANALYSIS SUMMARY (do NOT copy — re-evaluate using current data):\n"
-            f"{anchor_summary}"
-        )
+        sections.append(f"{PREVIOUS_ANALYSIS_HEADER}\n{anchor_summary}")
     else:
         log.info("No anchoring context — fresh analysis")
 
+    if signals:
+        signals_text = orjson.dumps(signals, default=str).decode()
+        sections.append(f"{INTRADAY_SIGNALS_HEADER}\n{signals_text}")
+
+    sections.append(f"{MARKET_STATE_HEADER}\n{state_json}")
+    anchored_state = "\n\n".join(sections)
+
+    log.info(f"System prompt {SYSTEM_PROMPT_SHA256[:12]}")
     try:
-        raw_response = llm.analyze(anchored_state, SYSTEM_PROMPT)
+        raw_response = llm.analyze(anchored_state, SYSTEM_PROMPT_CHUNKS)
     except Exception as e:
         log.error(f"LLM call failed: {e}")
         print(f"LLM call failed: {e}")
@@ -231,15 +243,22 @@ def cmd_analyze(args: argparse.Namespace) -> None:
 
     print_setups(output, errors)
 
-    log_path = config.DB_PATH.parent.parent / "logs" / "llm_outputs.jsonl"
-    log_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(log_path, "a") as f:
-        f.write(json.dumps({
-            "timestamp": output.timestamp,
-            "raw": raw_response,
-            "errors": errors,
-        }) + "\n")
-    log.info(f"Output logged to {log_path}")
+    # A replayed response is not a new analysis; storing it would reset the
+    # anchoring age and keep an old thesis alive
+    if llm.last_cache_hit:
+        log.info("Cached response, not stored as a new analysis")
+        conn.close()
+        return
+
+    store_llm_output(
+        conn,
+        timestamp=output.timestamp,
+        ts_ms=int(time.time() * 1000),
+        raw=raw_response,
+        errors=errors,
+        usage=llm.last_usage,
+    )
+    log.info(f"Output stored in {config.DB_PATH} (llm_outputs)")
 
     conn.close()
 
@@ -274,20 +293,15 @@ def cmd_status(args: argparse.Namespace) -> None:
 
 def cmd_signals(args: argparse.Namespace) -> None:
     """Show today's detected intraday signals."""
-    from src.features.signals import load_todays_signals, SIGNALS_PATH
-
-    signals = load_todays_signals(max_signals=100)
+    conn = get_conn()
+    signals = load_todays_signals(conn, max_signals=100)
+    conn.close()
 
     if not signals:
         print(f"\nNo signals detected today.")
         print(f"Signals fire when price crosses key levels (prior day high/low/close,")
         print(f"new intraday high/low, or >1% moves between snapshots).")
-        print(f"\nSignals file: {SIGNALS_PATH}")
-        print(f"File exists: {SIGNALS_PATH.exists()}")
-        if SIGNALS_PATH.exists():
-            import os
-            size = os.path.getsize(SIGNALS_PATH)
-            print(f"File size: {size} bytes")
+        print(f"\nSignals table: {config.DB_PATH} (signals)")
         return
 
     # Group by asset
@@ -305,12 +319,8 @@ def cmd_signals(args: argparse.Namespace) -> None:
         print(f"\n  {asset}:")
         for s in sigs:
             ts = s.get("ts", "?")
-            # Parse to show just time
-            try:
-                dt = datetime.fromisoformat(ts)
-                time_str = dt.strftime("%H:%M:%S UTC")
-            except Exception:
-                time_str = ts[:19] if len(ts) > 19 else ts
+            # Timestamps are UTC ISO-8601, so HH:MM:SS sits at a fixed offset
+            time_str = f"{ts[11:19]} UTC" if len(ts) >= 19 else ts
 
             event = s.get("event", "?")
             level = s.get("level", "")
@@ -325,7 +335,7 @@ def cmd_signals(args: argparse.Namespace) -> None:
             else:
                 print(f"    {time_str}  {event}  @ {price}")
 
-    print(f"\n  File: {SIGNALS_PATH}")
+    print(f"\n  DB: {config.DB_PATH} (signals)")
     print()
 
 
@@ -2,11 +2,39 @@
 
 from __future__ import annotations
 
-from pydantic import BaseModel, field_validator, model_validator
-from typing import Optional
-
-
-class ConfidenceCriterion(BaseModel):
+from pydantic import BaseModel, ConfigDict, TypeAdapter, field_validator, model_validator
+
+# Confidence weight per criterion, in the order the LLM scores them (0-10 each;
+# see CONFIDENCE SCORING in the system prompt). Weights sum to 10, so the
+# weighted sum is a 0-100 confidence.
+CONFIDENCE_WEIGHTS = (
+    2.0,  # Level quality
+    1.5,  # Risk/reward quality
+    1.5,  # Regime alignment
+    1.5,  # Multi-TF alignment
+    1.0,  # Volatility suitability
+    0.5,  # Funding/OI alignment
+    0.5,  # Orderbook health
+    0.25,  # Orderbook signal
+    0.25,  # Flow confirmation
+    1.0,  # No landmines
+)
+
+
+# Allowed values for the enumerated string fields
+_PLAYBOOKS = frozenset("ABCDE")
+_DIRECTIONS = frozenset({"long", "short", "no_trade"})
+_REGIMES = frozenset({"trend", "range", "high_vol", "low_vol", "chop"})
+
+
+class _LLMModel(BaseModel):
+    # Extra keys from the model are dropped, as before, rather than failing the
+    # whole output. Not frozen: validation and the validator's sizing pass
+    # correct values in place.
+    model_config = ConfigDict(extra="ignore")
+
+
+class ConfidenceCriterion(_LLMModel):
     criterion: str
     score: int
 
@@ -16,30 +44,30 @@ class ConfidenceCriterion(BaseModel):
         return self
 
 
-class EntryLevels(BaseModel):
+class EntryLevels(_LLMModel):
     trigger: float
     retest_zone_low: float
     retest_zone_high: float
 
 
-class Entry(BaseModel):
+class Entry(_LLMModel):
     type: str  # "trigger"
     trigger_conditions: list[str]
     entry_style: str  # limit_on_retest | stop_market_on_break | limit
     levels: EntryLevels
 
 
-class Stop(BaseModel):
+class Stop(_LLMModel):
     level: float
     why: str
 
 
-class TakeProfit(BaseModel):
+class TakeProfit(_LLMModel):
     level: float
     pct: int
 
 
-class Risk(BaseModel):
+class Risk(_LLMModel):
     risk_pct_equity: float
     max_loss_usd: float
     recommended_leverage: int
@@ -51,7 +79,7 @@ class Risk(BaseModel):
     liquidation_buffer_note: str
 
 
-class Setup(BaseModel):
+class Setup(_LLMModel):
     rank: int
     asset: str
     direction: str  # long | short | no_trade
@@ -77,27 +105,34 @@ class Setup(BaseModel):
     @field_validator("confidence_breakdown")
     @classmethod
     def exactly_10_criteria(cls, v: list[ConfidenceCriterion]) -> list[ConfidenceCriterion]:
-        if len(v) != 10:
-            raise ValueError(f"Must have exactly 10 criteria, got {len(v)}")
+        if len(v) != len(CONFIDENCE_WEIGHTS):
+            raise ValueError(f"Must have exactly {len(CONFIDENCE_WEIGHTS)} criteria, got {len(v)}")
+        return v
+
+    @field_validator("direction")
+    @classmethod
+    def valid_direction(cls, v: str) -> str:
+        if v not in _DIRECTIONS:
+            raise ValueError(f"Direction must be long, short or no_trade, got {v}")
         return v
 
     @field_validator("playbook")
     @classmethod
     def valid_playbook(cls, v: str) -> str:
-        if v not in ("A", "B", "C", "D", "E"):
+        if v not in _PLAYBOOKS:
             raise ValueError(f"Playbook must be A-E, got {v}")
         return v
 
     @model_validator(mode="after")
     def confidence_matches_breakdown(self) -> "Setup":
-        """Auto-correct confidence to the deterministic weighted sum."""
-        weights = [2.0, 1.5, 1.5, 1.5, 1.0, 0.5, 0.5, 0.25, 0.25, 1.0]
-        raw_scores = [c.score for c in self.confidence_breakdown]
-        self.confidence = round(sum(s * w for s, w in zip(raw_scores, weights)))
+        """Compute confidence server-side as the weighted sum of the raw scores."""
+        self.confidence = round(
+            sum(w * c.score for w, c in zip(CONFIDENCE_WEIGHTS, self.confidence_breakdown))
+        )
         return self
 
 
-class LLMOutput(BaseModel):
+class LLMOutput(_LLMModel):
     timestamp: str
     regime: str
     regime_note: str
@@ -107,7 +142,7 @@ class LLMOutput(BaseModel):
     @field_validator("regime")
     @classmethod
     def valid_regime(cls, v: str) -> str:
-        if v not in ("trend", "range", "high_vol", "low_vol", "chop"):
+        if v not in _REGIMES:
             raise ValueError(f"Invalid regime: {v}")
         return v
 
@@ -116,4 +151,8 @@ class LLMOutput(BaseModel):
     def exactly_3_setups(cls, v: list[Setup]) -> list[Setup]:
         if len(v) != 3:
             raise ValueError(f"Must have exactly 3 setups, got {len(v)}")
-        return v
\ No newline at end of file
+        return v
+
+
+# Built once; validate_json parses and validates the raw response in pydantic-core
+LLM_OUTPUT_ADAPTER: TypeAdapter[LLMOutput] = TypeAdapter(LLMOutput)
@@ -2,46 +2,51 @@
 
 from __future__ import annotations
 
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ConfigDict
 
 
-class PriceData(BaseModel):
+class _StateModel(BaseModel):
+    # Built once per snapshot by the feature engine and only read afterwards,
+    # so instances are immutable.
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+
+class PriceData(_StateModel):
     mark: float
     mid: float
     last: float
 
 
-class BarStats(BaseModel):
-    ret_1m: Optional[float] = None
-    ret_5m: Optional[float] = None
-    ret_15m: Optional[float] = None
-    ret_1h: Optional[float] = None
-    ret_4h: Optional[float] = None
-    atr_15m: Optional[float] = None
-    atr_1h: Optional[float] = None
-    atr_4h: Optional[float] = None
+class BarStats(_StateModel):
+    ret_1m: float | None = None
+    ret_5m: float | None = None
+    ret_15m: float | None = None
+    ret_1h: float | None = None
+    ret_4h: float | None = None
+    atr_15m: float | None = None
+    atr_1h: float | None = None
+    atr_4h: float | None = None
 
 
-class KeyLevels(BaseModel):
+class KeyLevels(_StateModel):
     day_high: float
     day_low: float
-    prior_day_high: Optional[float] = None
-    prior_day_low: Optional[float] = None
-    prior_day_close: Optional[float] = None
-    vwap: Optional[float] = None
+    prior_day_high: float | None = None
+    prior_day_low: float | None = None
+    prior_day_close: float | None = None
+    vwap: float | None = None
     # Classic floor pivots from prior day OHLC
-    pivot_pp: Optional[float] = None
-    pivot_r1: Optional[float] = None
-    pivot_r2: Optional[float] = None
-    pivot_s1: Optional[float] = None
-    pivot_s2: Optional[float] = None
+    pivot_pp: float | None = None
+    pivot_r1: float | None = None
+    pivot_r2: float | None = None
+    pivot_s1: float | None = None
+    pivot_s2: float | None = None
     # Multi-day context
-    week_high: Optional[float] = None
-    week_low: Optional[float] = None
+    week_high: float | None = None
+    week_low: float | None = None
 
 
-class OrderbookState(BaseModel):
+class OrderbookState(_StateModel):
     spread_bps: float
     bid_depth_01pct: float
     ask_depth_01pct: float
@@ -52,20 +57,20 @@ class OrderbookState(BaseModel):
     best_ask: float
 
 
-class FlowData(BaseModel):
-    aggressive_buy_ratio: Optional[float] = None
-    signed_volume_delta: Optional[float] = None
+class FlowData(_StateModel):
+    aggressive_buy_ratio: float | None = None
+    signed_volume_delta: float | None = None
 
 
-class FundingOI(BaseModel):
+class FundingOI(_StateModel):
     funding_rate: float
     open_interest: float
-    oi_delta_1h: Optional[float] = None
-    funding_1h_ago: Optional[float] = None
-    funding_trend: Optional[str] = None  # "rising", "falling", "stable", "extreme_long", "extreme_short"
+    oi_delta_1h: float | None = None
+    funding_1h_ago: float | None = None
+    funding_trend: str | None = None  # "rising", "falling", "stable", "extreme_long", "extreme_short"
 
 
-class RiskContext(BaseModel):
+class RiskContext(_StateModel):
     equity_usd: float
     max_loss_per_trade_usd: float
     max_total_risk_usd: float
@@ -73,7 +78,7 @@ class RiskContext(BaseModel):
     max_leverage: int
 
 
-class AssetState(BaseModel):
+class AssetState(_StateModel):
     symbol: str
     timestamp: str
     price: PriceData
@@ -84,7 +89,7 @@ class AssetState(BaseModel):
     funding_oi: FundingOI
 
 
-class MarketState(BaseModel):
+class MarketState(_StateModel):
     timestamp: str
     assets: list[AssetState]
     risk_context: RiskContext
\ No newline at end of file
@@ -5,151 +5,179 @@ V3: Auto-corrects position sizing from LLM using deterministic math.
 
 from __future__ import annotations
 
-import json
 import logging
+from collections.abc import Sequence
+from math import fabs
+from operator import itemgetter
 from typing import Tuple
 
 from pydantic import ValidationError
 
 from src.config import MAX_RISK_PER_TRADE_PCT, MAX_TOTAL_RISK_PCT, EQUITY_USD, MAX_LEVERAGE
-from src.models.llm_output import LLMOutput
+from src.models.llm_output import LLM_OUTPUT_ADAPTER, LLMOutput, Risk
 
 log = logging.getLogger(__name__)
 
+# Sizing invariants, fixed for the life of the process
+_EQUITY_PER_PCT = EQUITY_USD / 100  # USD per 1% of equity
+_MARGIN_BUDGET = EQUITY_USD * 0.5  # use up to 50% of equity as margin
 
-def validate_llm_output(raw_json: str) -> Tuple[LLMOutput | None, list[str]]:
+_LOC_MSG = itemgetter("loc", "msg")
+
+# Shared result for the common no-issues case
+_NO_ISSUES: tuple[str, ...] = ()
+
+
+def validate_llm_output(raw_json: str) -> Tuple[LLMOutput | None, Sequence[str]]:
     """Parse, validate, and auto-correct LLM JSON."""
     errors: list[str] = []
     corrections: list[str] = []
 
-    # Step 1: Parse JSON
+    # Step 1+2: Parse JSON and validate the schema in one pass
     try:
-        data = json.loads(raw_json)
-    except json.JSONDecodeError as e:
-        return None, [f"Invalid JSON: {e}"]
-
-    # Step 2: Schema validation via Pydantic
-    try:
-        output = LLMOutput(**data)
+        output = LLM_OUTPUT_ADAPTER.validate_json(raw_json)
     except ValidationError as e:
-        err_lines = []
-        for err in e.errors():
-            loc = " → ".join(str(l) for l in err["loc"])
-            err_lines.append(f"  {loc}: {err['msg']}")
+        details = e.errors(include_url=False, include_input=False)
+        # Unparseable JSON is reported as a single json_invalid error
+        if details and details[0]["type"] == "json_invalid":
+            return None, [details[0]["msg"]]  # "Invalid JSON: ..."
+        err_lines = [f"  {' → '.join(map(str, loc))}: {msg}" for loc, msg in map(_LOC_MSG, details)]
         return None, [f"Schema validation failed:\n" + "\n".join(err_lines)]
 
     # Step 3: Auto-correct position sizing + validate risk rules
     max_per_trade = MAX_RISK_PER_TRADE_PCT
     max_total = MAX_TOTAL_RISK_PCT
+    max_leverage = MAX_LEVERAGE
     total_risk = 0.0
+    # (rank, final Risk) of each tradeable setup, for the total-risk cap
+    tradeable: list[tuple[int, Risk]] = []
 
-    for setup in output.setups:
-        if setup.direction == "no_trade":
-            continue
+    active = [s for s in output.setups if s.direction != "no_trade"]
+    for setup in active:
+        risk = setup.risk
 
         # Cap risk_pct_equity
-        if setup.risk.risk_pct_equity > max_per_trade:
+        if risk.risk_pct_equity > max_per_trade:
             corrections.append(
                 f"Setup {setup.rank}: capped risk_pct from "
-                f"{setup.risk.risk_pct_equity}% to {max_per_trade}%"
+                f"{risk.risk_pct_equity}% to {max_per_trade}%"
             )
-            setup.risk.risk_pct_equity = max_per_trade
+            risk.risk_pct_equity = max_per_trade
 
         # Deterministic position sizing override
         entry_px = setup.entry.levels.trigger
         stop_px = setup.stop.level
 
         if entry_px > 0 and stop_px > 0 and entry_px != stop_px:
-            max_loss_usd = EQUITY_USD * setup.risk.risk_pct_equity / 100
-            stop_dist_pct = abs(entry_px - stop_px) / entry_px
-            notional = max_loss_usd / stop_dist_pct
-
-            # Compute leverage needed, cap at MAX_LEVERAGE
-            margin_budget = EQUITY_USD * 0.5  # use up to 50% of equity as margin
-            raw_leverage = notional / margin_budget
-            leverage = min(int(raw_leverage) + 1, MAX_LEVERAGE)
-
-            # If leverage needed exceeds max, reduce notional to fit
-            if raw_leverage > MAX_LEVERAGE:
-                notional = margin_budget * MAX_LEVERAGE
-                max_loss_usd = notional * stop_dist_pct
+            tps = setup.take_profits
+            tp1 = tps[0].level if tps else None
+            (
+                max_loss_usd, notional, leverage, margin_used, stop_dist_pct, rr_to_tp1, capped
+            ) = _recompute_sizing(entry_px, stop_px, tp1, risk.risk_pct_equity, max_leverage)
+            if capped:
                 corrections.append(
-                    f"Setup {setup.rank}: leverage capped at {MAX_LEVERAGE}x, "
+                    f"Setup {setup.rank}: leverage capped at {max_leverage}x, "
                     f"reduced notional to ${notional:,.0f}, max_loss=${max_loss_usd:,.2f}"
                 )
 
-            margin_used = notional / leverage
-
-            # Compute actual R:R
-            if len(setup.take_profits) > 0:
-                tp1 = setup.take_profits[0].level
-                risk_dist = abs(entry_px - stop_px)
-                reward_dist = abs(tp1 - entry_px)
-                rr_to_tp1 = round(reward_dist / risk_dist, 2) if risk_dist > 0 else 0
-            else:
-                rr_to_tp1 = 0
-
             # Log corrections if values changed significantly
-            old_notional = setup.risk.position_notional_usd
-            if old_notional > 0 and abs(notional - old_notional) / old_notional > 0.1:
+            old_notional = risk.position_notional_usd
+            if old_notional > 0 and fabs(notional - old_notional) / old_notional > 0.1:
                 corrections.append(
                     f"Setup {setup.rank} ({setup.asset}): corrected notional "
                     f"${old_notional:,.0f} → ${notional:,.0f}"
                 )
 
-            old_rr = setup.risk.rr_to_tp1
-            if old_rr > 0 and abs(rr_to_tp1 - old_rr) / old_rr > 0.1:
+            old_rr = risk.rr_to_tp1
+            if old_rr > 0 and fabs(rr_to_tp1 - old_rr) / old_rr > 0.1:
                 corrections.append(
                     f"Setup {setup.rank}: corrected R:R {old_rr:.2f} → {rr_to_tp1:.2f}"
                 )
 
-            # Overwrite with correct values
-            setup.risk.max_loss_usd = round(max_loss_usd, 2)
-            setup.risk.position_notional_usd = round(notional, 2)
-            setup.risk.recommended_leverage = leverage
-            setup.risk.margin_used_usd = round(margin_used, 2)
-            setup.risk.rr_to_tp1 = rr_to_tp1
-
-            # Liquidation buffer note
+            # Overwrite with correct values (one copy instead of per-field assignment)
             liq_dist_pct = (1 / leverage) * 100  # rough liq distance
-            setup.risk.liquidation_buffer_note = (
-                f"Liq ~{liq_dist_pct:.1f}% from entry, "
-                f"stop at {stop_dist_pct*100:.2f}% ({liq_dist_pct - stop_dist_pct*100:.1f}% buffer)"
-            )
+            risk = setup.risk = risk.model_copy(update={
+                "max_loss_usd": round(max_loss_usd, 2),
+                "position_notional_usd": round(notional, 2),
+                "recommended_leverage": leverage,
+                "margin_used_usd": round(margin_used, 2),
+                "rr_to_tp1": rr_to_tp1,
+                "liquidation_buffer_note": (
+                    f"Liq ~{liq_dist_pct:.1f}% from entry, "
+                    f"stop at {stop_dist_pct*100:.2f}% ({liq_dist_pct - stop_dist_pct*100:.1f}% buffer)"
+                ),
+            })
         # Note: confidence was auto-corrected by Pydantic model validator
         # Log if LLM's original confidence differed significantly
         # R:R hard gate: if < 1.5, downgrade to warning
-        if setup.risk.rr_to_tp1 < 1.5:
+        if risk.rr_to_tp1 < 1.5:
             errors.append(
                 f"Setup {setup.rank} ({setup.asset}): R:R to TP1 = "
-                f"{setup.risk.rr_to_tp1:.2f} (< 1.5 minimum). "
+                f"{risk.rr_to_tp1:.2f} (< 1.5 minimum). "
                 f"Consider NO_TRADE or wider targets."
             )
 
-        total_risk += setup.risk.risk_pct_equity
+        total_risk += risk.risk_pct_equity
+        tradeable.append((setup.rank, risk))
 
     # Total risk check
     if total_risk > max_total:
         # Scale down proportionally
         scale = max_total / total_risk
-        for setup in output.setups:
-            if setup.direction != "no_trade":
-                old_pct = setup.risk.risk_pct_equity
-                setup.risk.risk_pct_equity = round(old_pct * scale, 2)
-                corrections.append(
-                    f"Setup {setup.rank}: scaled risk {old_pct:.1f}% → "
-                    f"{setup.risk.risk_pct_equity:.1f}% (total risk cap)"
-                )
+        for rank, risk in tradeable:
+            old_pct = risk.risk_pct_equity
+            risk.risk_pct_equity = new_pct = round(old_pct * scale, 2)
+            corrections.append(
+                f"Setup {rank}: scaled risk {old_pct:.1f}% → {new_pct:.1f}% (total risk cap)"
+            )
+
+    if not corrections and not errors:
+        return output, _NO_ISSUES
 
-    if corrections:
-        log.info(f"Auto-corrections applied: {len(corrections)}")
+    if corrections and log.isEnabledFor(logging.INFO):
+        log.info("Auto-corrections applied: %d", len(corrections))
         for c in corrections:
-            log.info(f"  ✓ {c}")
+            log.info("  ✓ %s", c)
 
     # Combine corrections into errors for display
     all_issues = [f"✓ CORRECTED: {c}" for c in corrections] + errors
 
     if errors:
-        log.warning(f"Remaining validation issues: {len(errors)}")
+        log.warning("Remaining validation issues: %d", len(errors))
+
+    return output, all_issues
+
+
+def _recompute_sizing(
+    entry_px: float, stop_px: float, tp1: float | None, risk_pct: float, max_leverage: int
+) -> tuple[float, float, int, float, float, float, bool]:
+    """Deterministic sizing for one setup (pure arithmetic, no models).
+
+    Returns (max_loss_usd, notional, leverage, margin_used, stop_dist_pct,
+    rr_to_tp1, leverage_capped). Requires entry_px != stop_px, both > 0.
+    """
+    max_loss_usd = _EQUITY_PER_PCT * risk_pct
+    risk_dist = fabs(entry_px - stop_px)
+    stop_dist_pct = risk_dist / entry_px
+    notional = max_loss_usd / stop_dist_pct
+
+    # Compute leverage needed, cap at max_leverage
+    raw_leverage = notional / _MARGIN_BUDGET
+    leverage = min(int(raw_leverage) + 1, max_leverage)
+
+    # If leverage needed exceeds max, reduce notional to fit
+    capped = raw_leverage > max_leverage
+    if capped:
+        notional = _MARGIN_BUDGET * max_leverage
+        max_loss_usd = notional * stop_dist_pct
+
+    margin_used = notional / leverage
+
+    # Compute actual R:R
+    if tp1 is not None:
+        reward_dist = fabs(tp1 - entry_px)
+        rr_to_tp1 = round(reward_dist / risk_dist, 2) if risk_dist > 0 else 0
+    else:
+        rr_to_tp1 = 0
 
-    return output, all_issues
\ No newline at end of file
+    return max_loss_usd, notional, leverage, margin_used, stop_dist_pct, rr_to_tp1, capped